@@ -0,0 +1,218 @@
+"""Асинхронные обработчики чтения для ASGI (foodgram/asgi.py).
+
+GET рецептов, отдельных тегов и ингредиентов и подписок обслуживает тот
+же ViewSet, что и под WSGI: его аутентификация, права, фильтры,
+queryset, сериализаторы, пагинатор и обработка ошибок. Асинхронно
+выполняются только запросы к БД: токен (CachedTokenAuthentication
+.aauthenticate), COUNT и страница (async for выполняет и
+prefetch_related), связи пользователя и кэш ответов для гостей. Фильтры
+ходят в БД синхронно, через sync_to_async.
+
+Остальные методы, курсорная пагинация и browsable API передаются
+ViewSet'у целиком через sync_to_async.
+
+Списки тегов и ингредиентов здесь не обслуживаются: они отдаются из
+снимков и индекса в памяти, к БД не обращаются, а единственная
+проверка — версия в кэше — в Django 4.2 и через cache.aget выполняется
+в потоке (у бэкендов кэша нет своих асинхронных методов). Асинхронный
+обработчик добавил бы только лишний переход между потоками.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.response import Response
+
+from .cache import RECIPES, record_cache_access, recipes_cache_key
+from .pagination import uses_cursor
+from .relations import get_user_relations
+from .replicas import achoose_replica, primary, reading_from
+
+
+def wants_json(request):
+    """Клиент ждёт JSON, а не browsable API."""
+    return (request.GET.get('format', 'json') == 'json'
+            and 'text/html' not in request.headers.get('Accept', ''))
+
+
+def viewset_for(sync_view, args, kwargs):
+    """Экземпляр ViewSet'а, как его создаёт ViewSetMixin.as_view."""
+    viewset = sync_view.cls(**sync_view.initkwargs)
+    viewset.action_map = sync_view.actions
+    for method, action in sync_view.actions.items():
+        setattr(viewset, method, getattr(viewset, action))
+    viewset.args = args
+    viewset.kwargs = kwargs
+    viewset.headers = viewset.default_response_headers
+    return viewset
+
+
+async def authenticate(request):
+    """request.user через authentication_classes ViewSet'а.
+
+    Повторяет Request._authenticate; классы с aauthenticate
+    (CachedTokenAuthentication) ищут токен асинхронно.
+    """
+    for authenticator in request.authenticators:
+        try:
+            if hasattr(authenticator, 'aauthenticate'):
+                user_auth = await authenticator.aauthenticate(request)
+            else:
+                user_auth = await sync_to_async(authenticator.authenticate)(
+                    request)
+        except APIException:
+            request._not_authenticated()
+            raise
+        if user_auth is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+            return
+    request._not_authenticated()
+
+
+async def initial(viewset, request):
+    """APIView.initial без синхронной аутентификации и выбора реплики."""
+    viewset.format_kwarg = viewset.get_format_suffix(**viewset.kwargs)
+    request.accepted_renderer, request.accepted_media_type = (
+        viewset.perform_content_negotiation(request))
+    await authenticate(request)
+    viewset.check_permissions(request)
+    viewset.check_throttles(request)
+
+
+def async_view(handler, sync_view):
+    """GET обслуживает handler, остальное — синхронный sync_view.
+
+    Если handler вернул None, запрос тоже уходит в sync_view.
+    """
+    fallback = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET' and wants_json(request):
+            viewset = viewset_for(sync_view, args, kwargs)
+            request = viewset.initialize_request(request, *args, **kwargs)
+            viewset.request = request
+            try:
+                await initial(viewset, request)
+                database = None
+                if viewset.reads_replica(request):
+                    database = await achoose_replica(request.user)
+                with reading_from(database):
+                    response = await handler(viewset, request)
+            except Exception as exc:
+                response = viewset.handle_exception(exc)
+            if response is not None:
+                return viewset.finalize_response(
+                    request, response, *args, **kwargs)
+            request = request._request
+        return await fallback(request, *args, **kwargs)
+
+    # csrf_exempt в Django 4.2 не умеет оборачивать корутины.
+    view.csrf_exempt = True
+    return view
+
+
+async def paginate(viewset, queryset):
+    """Страница пагинатора ViewSet'а: COUNT и выборка — асинхронно."""
+    pagination = viewset.paginator
+    request = viewset.request
+    count = await queryset.acount()
+    paginator = Paginator(range(count), pagination.get_page_size(request))
+    try:
+        page = paginator.page(
+            pagination.get_page_number(request, paginator))
+    except InvalidPage:
+        raise NotFound(pagination.invalid_page_message)
+    pagination.request = request
+    pagination.page = page
+    rows = page.object_list
+    return [obj async for obj in queryset[rows.start:rows.stop]]
+
+
+async def get_object(viewset):
+    """Как GenericAPIView.get_object, но запрос к БД асинхронный."""
+    queryset = await sync_to_async(viewset.filter_queryset)(
+        viewset.get_queryset())
+    lookup_url_kwarg = viewset.lookup_url_kwarg or viewset.lookup_field
+    try:
+        obj = await queryset.aget(
+            **{viewset.lookup_field: viewset.kwargs[lookup_url_kwarg]})
+    except (queryset.model.DoesNotExist, TypeError, ValueError,
+            ValidationError):
+        raise Http404
+    viewset.check_object_permissions(viewset.request, obj)
+    return obj
+
+
+async def serialize(viewset, instance, many=False):
+    """Данные сериализатора ViewSet'а; связи пользователя — заранее."""
+    if viewset.request.user.is_authenticated:
+        await get_user_relations(viewset.request).aload()
+    return viewset.get_serializer(instance, many=many).data
+
+
+async def cached_for_guest(viewset, build):
+    """Как RecipesViewSet.cached: гостям — общий ответ из кэша."""
+    request = viewset.request
+    if request.user.is_authenticated:
+        return Response(await build())
+    key = await sync_to_async(recipes_cache_key)(
+        request, viewset.action, viewset.kwargs.get('pk'))
+    data = await cache.aget(key)
+    await sync_to_async(record_cache_access)(RECIPES, data is not None)
+    if data is None:
+        with primary():
+            data = await build()
+        await cache.aset(key, data, settings.RECIPES_CACHE_TIMEOUT)
+        hit = 'MISS'
+    else:
+        hit = 'HIT'
+    response = Response(data)
+    response['X-Cache'] = hit
+    return response
+
+
+async def recipe_list(viewset, request):
+    if uses_cursor(request):
+        return None
+
+    async def build():
+        queryset = await sync_to_async(viewset.filter_queryset)(
+            viewset.get_queryset())
+        recipes = await paginate(viewset, queryset)
+        data = await serialize(viewset, recipes, many=True)
+        return viewset.get_paginated_response(data).data
+
+    return await cached_for_guest(viewset, build)
+
+
+async def recipe_detail(viewset, request):
+    async def build():
+        return await serialize(viewset, await get_object(viewset))
+
+    return await cached_for_guest(viewset, build)
+
+
+async def detail(viewset, request):
+    return Response(await serialize(viewset, await get_object(viewset)))
+
+
+async def subscriptions(viewset, request):
+    if uses_cursor(request):
+        return None
+    authors = await paginate(viewset, viewset.get_subscriptions())
+    return viewset.get_paginated_response(
+        viewset.get_subscriptions_serializer(authors).data)
+
+
+# Имя маршрута DefaultRouter -> асинхронный обработчик GET.
+ROUTES = {
+    'recipe-list': recipe_list,
+    'recipe-detail': recipe_detail,
+    'tags-detail': detail,
+    'ingredient-detail': detail,
+    'users-list-subscriptions': subscriptions,
+}
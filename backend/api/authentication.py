@@ -0,0 +1,287 @@
+"""Аутентификация по токену без запроса к БД на каждый вызов API.
+
+Токены с пользователями хранятся в LRU-кэше процесса: TOKEN_CACHE_SIZE
+записей, TOKEN_CACHE_TIMEOUT секунд.
+
+Если кэш Django общий для процессов (redis, file), в нём лежит номер
+отзыва токена: он увеличивается при каждом сбросе. Запись LRU помнит
+номер, прочитанный до запроса к БД, и годится, только пока он совпадает
+с номером в общем кэше, так что отзыв сразу действует во всех
+процессах. Там же на TOKEN_CACHE_SHARED_TIMEOUT секунд сохраняется
+(id пользователя, is_active, номер отзыва): другому процессу достаточно
+загрузить пользователя, а неактивного он отклонит без БД. Хэш пароля и
+остальные поля пользователя в общий кэш не попадают.
+
+С locmem (один процесс, см. settings) номера отзыва нет, изменения из
+других процессов (manage.py changepassword) доходят до LRU не позже
+чем через TOKEN_CACHE_TIMEOUT.
+
+Записи сбрасываются сигналами (api.signals): при удалении токена
+(delete_token, удаление пользователя) и при сохранении пользователя,
+которое может менять пароль или is_active. Массовый QuerySet.update()
+сигналов не отправляет.
+"""
+import copy
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authentication import get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.models import CustomUser
+from .cache import is_shared
+
+LOCAL = 'local'
+SHARED = 'shared'
+MISS = 'miss'
+
+
+def shared_key(key):
+    return f'auth_token:{key}'
+
+
+def revision_key(key):
+    return f'auth_token_revision:{key}'
+
+
+def detached(token):
+    """Копия токена и пользователя: запрос может менять request.user."""
+    token = copy.copy(token)
+    token.user = copy.copy(token.user)
+    return token
+
+
+# token — копия Token из LRU или None; user — (id, is_active) из общего
+# кэша; revision — передаётся в TokenCache.set после чтения из БД.
+Lookup = namedtuple('Lookup', 'token user revision')
+
+
+class TokenCache:
+    """Ключ токена -> Token с загруженным user."""
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.results = Counter()
+        self.generation = 0
+
+    def local(self, key, revision=None):
+        """Копия токена из LRU, если запись жива и номер отзыва тот же."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now and entry[1] == revision:
+                self.entries.move_to_end(key)
+                self.results[LOCAL] += 1
+                return detached(entry[2])
+            self.entries.pop(key, None)
+        return None
+
+    def found(self, key, entries):
+        """Lookup по ответу общего кэша."""
+        revision = entries.get(revision_key(key))
+        token = self.local(key, revision)
+        if token is not None:
+            return Lookup(token, None, revision)
+        entry = entries.get(shared_key(key))
+        with self.lock:
+            if entry is None or entry[2] != revision:
+                self.results[MISS] += 1
+                return Lookup(None, None, revision)
+            self.results[SHARED] += 1
+        return Lookup(None, entry[:2], revision)
+
+    def get(self, key):
+        """Lookup токена; обращения учитываются в метриках."""
+        if not is_shared():
+            generation = self.generation
+            token = self.local(key)
+            if token is None:
+                self.count(MISS)
+            return Lookup(token, None, generation)
+        return self.found(key, cache.get_many(
+            [shared_key(key), revision_key(key)]))
+
+    async def aget(self, key):
+        if not is_shared():
+            return self.get(key)
+        return self.found(key, await cache.aget_many(
+            [shared_key(key), revision_key(key)]))
+
+    def count(self, result):
+        with self.lock:
+            self.results[result] += 1
+
+    def remember(self, token, revision):
+        """Кладёт токен в LRU; при locmem revision — номер поколения."""
+        shared = is_shared()
+        with self.lock:
+            if not shared and revision != self.generation:
+                return
+            self.entries[token.key] = (
+                time.monotonic() + self.timeout,
+                revision if shared else None,
+                detached(token),
+            )
+            self.entries.move_to_end(token.key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def shared_entry(self, token, revision):
+        return (token.user_id, token.user.is_active, revision)
+
+    def set(self, token, revision):
+        """Кладёт загруженный из БД токен в кэш.
+
+        revision — Lookup.revision, полученный до запроса к БД: если
+        за это время токен сбросили, прочитанное могло устареть.
+        """
+        self.remember(token, revision)
+        if is_shared():
+            cache.set(
+                shared_key(token.key), self.shared_entry(token, revision),
+                settings.TOKEN_CACHE_SHARED_TIMEOUT,
+            )
+
+    async def aset(self, token, revision):
+        self.remember(token, revision)
+        if is_shared():
+            await cache.aset(
+                shared_key(token.key), self.shared_entry(token, revision),
+                settings.TOKEN_CACHE_SHARED_TIMEOUT,
+            )
+
+    def forget(self, *keys):
+        with self.lock:
+            self.generation += 1
+            for key in keys:
+                self.entries.pop(key, None)
+        if not is_shared():
+            return
+        # Номер должен жить дольше записей, прочитанных до сброса.
+        timeout = 2 * settings.TOKEN_CACHE_SHARED_TIMEOUT
+        for key in keys:
+            try:
+                cache.incr(revision_key(key))
+            except ValueError:
+                if not cache.add(revision_key(key), 1, timeout):
+                    cache.incr(revision_key(key))
+        cache.delete_many([shared_key(key) for key in keys])
+
+    def forget_user(self, user_id):
+        self.forget(*Token.objects.filter(user_id=user_id).values_list(
+            'key', flat=True))
+
+    def render(self):
+        """Счётчики в текстовом формате Prometheus (см. api.metrics)."""
+        pid = os.getpid()
+        name = 'foodgram_token_cache_lookups_total'
+        lines = [
+            f'# HELP {name} Token lookups by the level that answered.',
+            f'# TYPE {name} counter',
+        ]
+        with self.lock:
+            for result in (LOCAL, SHARED, MISS):
+                lines.append(
+                    f'{name}{{pid="{pid}",result="{result}"}} '
+                    f'{self.results[result]}'
+                )
+            entries = len(self.entries)
+        name = 'foodgram_token_cache_entries'
+        lines += [
+            f'# HELP {name} Tokens held in the process cache.',
+            f'# TYPE {name} gauge',
+            f'{name}{{pid="{pid}"}} {entries}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+token_cache = TokenCache(
+    settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TIMEOUT)
+
+
+def check_active(token):
+    if not token.user.is_active:
+        raise AuthenticationFailed(_('User inactive or deleted.'))
+    return token.user, token
+
+
+def check_lookup(lookup):
+    """Отклоняет неактивного пользователя по записи общего кэша."""
+    if lookup.user is not None and not lookup.user[1]:
+        raise AuthenticationFailed(_('User inactive or deleted.'))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который берёт токен из token_cache.
+
+    aauthenticate — то же для асинхронных обработчиков api.async_views.
+    """
+    def get_key(self, request):
+        """Ключ из заголовка «Authorization: Token <key>» или None."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise AuthenticationFailed(
+                _('Invalid token header. No credentials provided.'))
+        if len(auth) > 2:
+            raise AuthenticationFailed(
+                _('Invalid token header. '
+                  'Token string should not contain spaces.'))
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed(
+                _('Invalid token header. '
+                  'Token string should not contain invalid characters.'))
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return self.authenticate_credentials(key)
+
+    def authenticate_credentials(self, key):
+        lookup = token_cache.get(key)
+        token = lookup.token
+        if token is None:
+            check_lookup(lookup)
+            try:
+                if lookup.user is None:
+                    token = Token.objects.select_related('user').get(key=key)
+                else:
+                    token = Token(key=key, user=CustomUser.objects.get(
+                        pk=lookup.user[0]))
+            except (Token.DoesNotExist, CustomUser.DoesNotExist):
+                raise AuthenticationFailed(_('Invalid token.'))
+            token_cache.set(token, lookup.revision)
+        return check_active(token)
+
+    async def aauthenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        lookup = await token_cache.aget(key)
+        token = lookup.token
+        if token is None:
+            check_lookup(lookup)
+            try:
+                if lookup.user is None:
+                    token = await Token.objects.select_related('user').aget(
+                        key=key)
+                else:
+                    token = Token(key=key, user=await CustomUser.objects.aget(
+                        pk=lookup.user[0]))
+            except (Token.DoesNotExist, CustomUser.DoesNotExist):
+                raise AuthenticationFailed(_('Invalid token.'))
+            await token_cache.aset(token, lookup.revision)
+        return check_active(token)
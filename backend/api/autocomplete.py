@@ -0,0 +1,74 @@
+import heapq
+import threading
+from bisect import bisect_left
+
+from recipes.models import Ingredient
+from .cache import INGREDIENTS, get_version
+from .replicas import primary
+
+# Верхняя граница для префикса при поиске через bisect.
+MAX_CHAR = '\U0010ffff'
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса.
+
+    Названия хранятся в отсортированном списке в нижнем регистре,
+    поиск по префиксу — двоичный. Индекс перестраивается при первом
+    запросе после изменения ингредиентов (см. api.signals).
+    """
+    def __init__(self):
+        self.version = None
+        # (ключи, ингредиенты) одним кортежем: поиск берёт оба списка
+        # одной ссылкой и не смешивает старый индекс с новым.
+        self.index = ((), ())
+        self.lock = threading.Lock()
+
+    def build(self, rows):
+        """Строит индекс из строк (id, название, единица измерения)."""
+        rows = sorted(
+            (name.casefold(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in rows
+        )
+        items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, pk, name, measurement_unit in rows
+        ]
+        self.index = [row[0] for row in rows], items
+
+    def load(self):
+        self.build(
+            Ingredient.objects
+            .values_list('id', 'name', 'measurement_unit')
+            .iterator()
+        )
+
+    def refresh(self):
+        version = get_version(INGREDIENTS)
+        if version == self.version:
+            return
+        with self.lock:
+            if version != self.version:
+                with primary():
+                    self.load()
+                self.version = version
+
+    def search(self, prefix, limit):
+        """Ингредиенты, название которых начинается с prefix.
+
+        Сначала точное совпадение, затем более короткие названия.
+        """
+        self.refresh()
+        keys, items = self.index
+        prefix = prefix.strip().casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + MAX_CHAR, start)
+        best = heapq.nsmallest(
+            limit,
+            range(start, end),
+            key=lambda index: (len(keys[index]), index)
+        )
+        return [items[index] for index in best]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,169 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.cache import quote_etag
+
+from .replicas import primary
+
+INGREDIENTS = 'ingredients'
+RECIPES = 'recipes'
+TAGS = 'tags'
+
+# Параметры, от которых зависит ответ для анонимного пользователя.
+RECIPES_CACHE_PARAMS = (
+    'tags', 'author', 'search', 'page', 'limit', 'pagination', 'cursor',
+    'count',
+)
+
+
+def version_key(name):
+    return f'version:{name}'
+
+
+def modified_key(name):
+    return f'modified:{name}'
+
+
+def is_shared():
+    """Видят ли кэш другие процессы: locmem у каждого процесса свой."""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def get_version(name):
+    """Текущая версия набора данных — счётчик в кэше.
+
+    Новый счётчик начинается с текущего времени в микросекундах, чтобы
+    после очистки кэша не повторить уже выданные версии (их могли
+    запомнить клиенты в ETag).
+    """
+    key = version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*names):
+    """Новая версия для каждого набора: старые записи кэша устаревают.
+
+    Версии увеличиваются атомарно (cache.incr), поэтому два изменения
+    подряд, даже в одну секунду и из разных процессов, дают разные
+    версии. Если версии в кэше нет, её создаст get_version.
+    """
+    for name in names:
+        try:
+            cache.incr(version_key(name))
+        except ValueError:
+            pass
+    cache.set_many({modified_key(name): time.time() for name in names}, None)
+
+
+def last_modified(name):
+    """Время изменения для Last-Modified (целые секунды) или None.
+
+    Last-Modified различает только секунды: если набор изменился в
+    текущую секунду, следующее изменение может получить то же время,
+    и клиент с If-Modified-Since получил бы 304 на новые данные.
+    В этом случае заголовок не отдаётся, остаётся ETag.
+    """
+    modified = cache.get(modified_key(name))
+    if modified is None or int(modified) >= int(time.time()):
+        return None
+    return int(modified)
+
+
+def shopping_cart_name(user_id):
+    return f'shopping_cart:{user_id}'
+
+
+def shopping_cart_etag(user_id, export_format, version):
+    return quote_etag(f'{user_id}-{export_format}-{version}')
+
+
+def shopping_cart_key(user_id, export_format, version):
+    return f'shopping_cart:{user_id}:{export_format}:{version}'
+
+
+def cache_response(response, key, timeout):
+    """Кэширует тело ответа; потоковый ответ сохраняется после отдачи."""
+    if not response.streaming:
+        cache.set(key, response.content, timeout)
+        return response
+
+    def tee(chunks):
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        cache.set(key, b''.join(parts), timeout)
+
+    response.streaming_content = tee(response.streaming_content)
+    return response
+
+
+def recipes_cache_key(request, action, pk=None):
+    """Ключ ответа каталога рецептов для анонимного пользователя.
+
+    Ссылки next/previous в ответе абсолютные, поэтому в ключ входят
+    схема и хост запроса.
+    """
+    query_params = request.query_params
+    params = [
+        (name, sorted(query_params.getlist(name)))
+        for name in RECIPES_CACHE_PARAMS
+        if name in query_params
+    ]
+    origin = (request.scheme, request.get_host())
+    digest = hashlib.md5(
+        repr((origin, action, pk, params)).encode()
+    ).hexdigest()
+    return f'recipes:{get_version(RECIPES)}:{digest}'
+
+
+def record_cache_access(name, hit):
+    """Счётчики попаданий и промахов кэша, общие для всех процессов."""
+    key = f'cache_stats:{name}:{"hits" if hit else "misses"}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cache_stats(name):
+    hits = cache.get(f'cache_stats:{name}:hits', 0)
+    misses = cache.get(f'cache_stats:{name}:misses', 0)
+    return hits, misses
+
+
+class Snapshot:
+    """Готовое тело ответа справочника в памяти процесса.
+
+    Хранится в виде байтов вместе со strong ETag и пересобирается
+    при первом обращении после смены версии набора данных.
+    """
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+        self.version = None
+        # (тело, ETag) одним кортежем: читатель не получит новое тело
+        # со старым ETag.
+        self.current = (b'', '')
+        self.lock = threading.Lock()
+
+    def get(self):
+        version = get_version(self.name)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    with primary():
+                        content = self.build()
+                    self.current = content, quote_etag(
+                        hashlib.sha1(content).hexdigest()
+                    )
+                    self.version = version
+        return self.current
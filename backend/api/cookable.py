@@ -0,0 +1,180 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.core.cache import cache
+
+from recipes.models import RecipeIngredient
+from .replicas import primary
+
+# Журнал изменённых рецептов, общий для процессов через кэш.
+SEQUENCE_KEY = 'recipe_ingredients:seq'
+CHANGE_TIMEOUT = 60 * 60
+# Если отстали сильнее, дешевле перестроить индекс целиком.
+MAX_REPLAY = 1000
+# id — BigAutoField, поэтому массивы 64-битные.
+TYPECODE = 'Q'
+
+
+def change_key(seq):
+    return f'recipe_ingredients:change:{seq}'
+
+
+def current_sequence():
+    sequence = cache.get(SEQUENCE_KEY)
+    if sequence is None:
+        cache.add(SEQUENCE_KEY, 0, None)
+        sequence = cache.get(SEQUENCE_KEY)
+    return sequence
+
+
+def publish_changes(recipe_ids):
+    """Записывает в журнал рецепты, у которых изменился состав."""
+    current_sequence()
+    sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(change_key(sequence), list(recipe_ids), CHANGE_TIMEOUT)
+    return sequence
+
+
+def reset_index():
+    """Все процессы перестроят индекс целиком при следующем запросе."""
+    current_sequence()
+    cache.incr(SEQUENCE_KEY, MAX_REPLAY + 1)
+
+
+class CookableIndex:
+    """Обратный индекс «ингредиент -> рецепты» в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов
+    (array), для каждого рецепта — массив id его ингредиентов.
+    Изменения состава рецептов приходят через журнал в кэше
+    (см. api.signals) и применяются точечно, без полной перестройки.
+
+    Словари и массивы после публикации не меняются: обновление строит
+    копии и подменяет их под блокировкой, а поиск берёт ссылки на
+    текущие и считает без блокировки.
+    """
+    def __init__(self):
+        self.sequence = None
+        self.postings = {}
+        self.recipes = {}
+        self.lock = threading.Lock()
+
+    def build(self, rows):
+        """Строит индекс из пар (recipe_id, ingredient_id)."""
+        postings = {}
+        recipes = {}
+        for recipe_id, ingredient_id in rows:
+            postings.setdefault(
+                ingredient_id, array(TYPECODE)).append(recipe_id)
+            recipes.setdefault(
+                recipe_id, array(TYPECODE)).append(ingredient_id)
+        for ingredient_id, recipe_ids in postings.items():
+            postings[ingredient_id] = array(TYPECODE, sorted(recipe_ids))
+        self.postings, self.recipes = postings, recipes
+
+    def load(self):
+        self.build(
+            RecipeIngredient.objects
+            .values_list('recipe_id', 'ingredient_id')
+            .iterator(chunk_size=10000)
+        )
+
+    def update_recipes(self, recipe_ids):
+        """Перечитывает состав указанных рецептов одним запросом."""
+        rows = list(
+            RecipeIngredient.objects
+            .filter(recipe_id__in=recipe_ids)
+            .values_list('recipe_id', 'ingredient_id')
+        )
+        postings, recipes = dict(self.postings), dict(self.recipes)
+        copied = set()
+
+        def posting(ingredient_id):
+            if ingredient_id not in copied:
+                copied.add(ingredient_id)
+                postings[ingredient_id] = array(
+                    TYPECODE, postings.get(ingredient_id, ()))
+            return postings[ingredient_id]
+
+        for recipe_id in recipe_ids:
+            for ingredient_id in recipes.pop(recipe_id, ()):
+                ids = posting(ingredient_id)
+                index = bisect_left(ids, recipe_id)
+                if index < len(ids) and ids[index] == recipe_id:
+                    del ids[index]
+        for recipe_id, ingredient_id in rows:
+            recipes.setdefault(
+                recipe_id, array(TYPECODE)).append(ingredient_id)
+            insort(posting(ingredient_id), recipe_id)
+        for ingredient_id in copied:
+            if not postings[ingredient_id]:
+                del postings[ingredient_id]
+        self.postings, self.recipes = postings, recipes
+
+    def refresh(self):
+        sequence = current_sequence()
+        if sequence == self.sequence:
+            return
+        with self.lock, primary():
+            if sequence == self.sequence:
+                return
+            behind = sequence - (self.sequence or 0)
+            # Журнал мог пропасть вместе с кэшем (счётчик начался заново).
+            if self.sequence is None or not 0 < behind <= MAX_REPLAY:
+                self.load()
+            else:
+                changes = cache.get_many(
+                    [change_key(seq)
+                     for seq in range(self.sequence + 1, sequence + 1)]
+                )
+                if len(changes) < behind:
+                    self.load()
+                else:
+                    self.update_recipes(
+                        set().union(*changes.values()))
+            self.sequence = sequence
+
+    def apply(self, recipe_ids):
+        """Изменения текущего процесса: индекс обновляется сразу."""
+        sequence = publish_changes(recipe_ids)
+        with self.lock:
+            if self.sequence is not None and sequence == self.sequence + 1:
+                self.update_recipes(recipe_ids)
+                self.sequence = sequence
+
+    def rank(self, ingredient_ids, limit):
+        """Рецепты по доле имеющихся ингредиентов.
+
+        Возвращает до limit кортежей (recipe_id, coverage, missing):
+        сначала полнее покрытые, затем с меньшим числом недостающих
+        и более новые.
+        """
+        with self.lock:
+            postings, recipes = self.postings, self.recipes
+        matches = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matches.update(postings.get(ingredient_id, ()))
+        best = heapq.nlargest(
+            limit,
+            matches.items(),
+            key=lambda item: (
+                item[1] / len(recipes[item[0]]),
+                item[1] - len(recipes[item[0]]),
+                item[0],
+            ),
+        )
+        return [
+            (recipe_id, found / len(recipes[recipe_id]),
+             len(recipes[recipe_id]) - found)
+            for recipe_id, found in best
+        ]
+
+    def search(self, ingredient_ids, limit):
+        self.refresh()
+        return self.rank(ingredient_ids, limit)
+
+
+cookable_index = CookableIndex()
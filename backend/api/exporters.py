@@ -0,0 +1,144 @@
+import csv
+import json
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+FONT_NAME = 'DejaVuSans'
+FILENAME = 'shopping_cart'
+TITLE = 'Ваш список покупок.'
+
+PDF_LEFT = 100
+PDF_TOP = 750
+PDF_BOTTOM = 50
+PDF_LINE_HEIGHT = 20
+
+
+@lru_cache(maxsize=None)
+def register_fonts():
+    """Регистрация шрифта для PDF, один раз на процесс."""
+    font_path = os.path.join(
+        settings.BASE_DIR,
+        'recipes/fonts/DejaVuSans.ttf'
+    )
+    pdfmetrics.registerFont(TTFont(FONT_NAME, font_path))
+    return FONT_NAME
+
+
+def ingredient_line(name, unit, total):
+    return f'{name}: {total} {unit}'
+
+
+class Echo:
+    """Псевдобуфер: csv.writer возвращает строку вместо записи."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(shopping_list):
+    """Построчная выгрузка в CSV."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for name, unit, total in shopping_list:
+        yield writer.writerow((name, total, unit))
+
+
+def stream_txt(shopping_list):
+    """Построчная выгрузка простым текстом."""
+    yield f'{TITLE}\n\n'
+    for name, unit, total in shopping_list:
+        yield ingredient_line(name, unit, total) + '\n'
+
+
+def stream_json(shopping_list):
+    """Выгрузка JSON-массива по одному элементу."""
+    yield '['
+    separator = ''
+    for name, unit, total in shopping_list:
+        yield separator + json.dumps(
+            {'name': name, 'amount': total, 'measurement_unit': unit},
+            ensure_ascii=False
+        )
+        separator = ', '
+    yield ']'
+
+
+def render_pdf(shopping_list):
+    """PDF со списком покупок, длинный список переносится на новые листы."""
+    font = register_fonts()
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    pdf.setTitle('Shopping Cart')
+    pdf.setFont(font, 16)
+    pdf.drawString(PDF_LEFT, PDF_TOP, TITLE)
+    pdf.setFont(font, 12)
+    y = PDF_TOP - 50
+    for name, unit, total in shopping_list:
+        if y < PDF_BOTTOM:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = PDF_TOP
+        pdf.drawString(PDF_LEFT, y, ingredient_line(name, unit, total))
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+    return buffer.getvalue()
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'txt': stream_txt,
+    'json': stream_json,
+}
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'csv': 'text/csv; charset=utf-8',
+    'txt': 'text/plain; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+def attach(response, export_format):
+    response['Content-Disposition'] = (
+        f'attachment; filename="{FILENAME}.{export_format}"'
+    )
+    return response
+
+
+def export_shopping_list(shopping_list, export_format):
+    """HTTP-ответ со списком покупок в выбранном формате."""
+    if export_format in STREAMS:
+        response = StreamingHttpResponse(
+            STREAMS[export_format](shopping_list),
+            content_type=CONTENT_TYPES[export_format]
+        )
+    else:
+        export_format = 'pdf'
+        response = HttpResponse(
+            render_pdf(shopping_list),
+            content_type=CONTENT_TYPES[export_format]
+        )
+    return attach(response, export_format)
+
+
+def render_document(shopping_list, export_format):
+    """Документ целиком в байтах (для фоновой выгрузки)."""
+    if export_format in STREAMS:
+        return ''.join(STREAMS[export_format](shopping_list)).encode()
+    return render_pdf(shopping_list)
+
+
+def document_response(document, export_format):
+    """HTTP-ответ с уже готовым документом из кэша."""
+    response = HttpResponse(
+        document,
+        content_type=CONTENT_TYPES[export_format]
+    )
+    return attach(response, export_format)
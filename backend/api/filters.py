@@ -3,13 +3,14 @@ from django.contrib.auth import get_user_model
 from django_filters import rest_framework as filters
 
 from recipes.models import Recipe, Tags
+from recipes.search import search_recipes
 
 
 User = get_user_model()
 
 
 class RecipeFilter(filters.FilterSet):
-    """Фильтр для рецептов.(теги/избранное/список покупок)"""
+    """Фильтр для рецептов.(теги/избранное/список покупок/поиск)"""
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited')
 
@@ -20,6 +21,7 @@ class RecipeFilter(filters.FilterSet):
         queryset=Tags.objects.all(),
         field_name='tags__slug',
         to_field_name='slug')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -37,6 +39,9 @@ class RecipeFilter(filters.FilterSet):
             return queryset.filter(is_in_shopping_cart__user=user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
 
 class IngredientFilter(SearchFilter):
     """Фильтр для поиска ингредиента."""
@@ -0,0 +1,77 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.autocomplete import IngredientIndex
+
+SYLLABLES = (
+    'ба', 'ва', 'го', 'да', 'ке', 'ли', 'ма', 'но', 'па', 'ро',
+    'са', 'то', 'ук', 'фе', 'хо', 'це', 'чи', 'ша', 'юр', 'ян',
+)
+UNITS = ('г', 'кг', 'мл', 'л', 'шт', 'ст. л.', 'ч. л.')
+
+
+def synthetic_rows(ingredients, rng):
+    """Строки (id, название, единица) с уникальными названиями."""
+    names = set()
+    while len(names) < ingredients:
+        names.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 5))))
+    return [
+        (pk, name.capitalize(), rng.choice(UNITS))
+        for pk, name in enumerate(sorted(names), start=1)
+    ]
+
+
+def scan(rows, prefix, limit):
+    """Без индекса: istartswith по всем строкам, как фильтр по БД."""
+    prefix = prefix.casefold()
+    found = sorted(
+        (len(name), name.casefold(), pk)
+        for pk, name, _ in rows
+        if name.casefold().startswith(prefix)
+    )
+    return found[:limit]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the in-memory ingredient autocomplete index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', type=int, default=50_000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        rows = synthetic_rows(options['ingredients'], rng)
+        index = IngredientIndex()
+        started = time.perf_counter()
+        index.build(rows)
+        built = time.perf_counter() - started
+        self.stdout.write(
+            f'build: {len(rows)} ingredients in {built * 1000:.1f} ms')
+
+        # Префиксы длиной 1-4 символа из существующих названий.
+        prefixes = [
+            name[:rng.randint(1, 4)]
+            for _, name, _ in rng.choices(rows, k=options['queries'])
+        ]
+        # Иначе refresh() перестроит индекс из БД вместо синтетического.
+        index.refresh = lambda: None
+        for label, search in (
+            ('index', lambda prefix: index.search(prefix, options['limit'])),
+            ('scan', lambda prefix: scan(rows, prefix, options['limit'])),
+        ):
+            timings = []
+            for prefix in prefixes:
+                started = time.perf_counter()
+                search(prefix)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            self.stdout.write(
+                f'{label:5}: p50 {timings[len(timings) // 2] * 1000:.3f} ms, '
+                f'p95 {timings[int(len(timings) * 0.95)] * 1000:.3f} ms, '
+                f'max {timings[-1] * 1000:.3f} ms'
+            )
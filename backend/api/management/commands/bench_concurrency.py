@@ -0,0 +1,183 @@
+import asyncio
+import time
+from collections import Counter
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.management.commands.run_benchmarks import percentile
+from recipes.models import Ingredient, Recipe
+from recipes.seeding import synthetic_users
+from users.models import CustomUser
+
+NETWORK_ERRORS = (
+    OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError,
+)
+
+
+def read_paths():
+    """Горячие маршруты чтения: каталог, рецепт, справочники, подписки."""
+    recipe = Recipe.objects.order_by('pk').first()
+    if recipe is None:
+        raise CommandError('В базе нет рецептов; запустите seed_data.')
+    prefix = Ingredient.objects.order_by('pk').values_list(
+        'name', flat=True).first()[:2]
+    return [
+        '/api/recipes/',
+        '/api/recipes/?page=2',
+        f'/api/recipes/{recipe.pk}/',
+        '/api/tags/',
+        f'/api/ingredients/?name={prefix}',
+        '/api/users/subscriptions/?recipes_limit=3',
+    ]
+
+
+async def fetch(reader, writer, request):
+    """Один запрос HTTP/1.1; возвращает статус и нужно ли закрыть сокет."""
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('сервер закрыл соединение')
+    status = int(status_line.split()[1])
+    length, chunked, close = 0, False, False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding':
+            chunked = 'chunked' in value
+        elif name == 'connection':
+            close = value == 'close'
+    if not chunked:
+        await reader.readexactly(length)
+        return status, close
+    while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        await reader.readexactly(size + 2)
+        if not size:
+            return status, close
+
+
+class Load:
+    """Результаты одного прогона по одному адресу."""
+    def __init__(self):
+        self.timings = []
+        self.statuses = Counter()
+        self.errors = 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure requests/sec of running WSGI and ASGI deployments '
+        'with many concurrent keep-alive clients'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+',
+            help='адреса серверов, например http://127.0.0.1:8000',
+        )
+        parser.add_argument('--clients', type=int, default=100)
+        parser.add_argument('--duration', type=float, default=10,
+                            help='секунд на каждый адрес')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='маршрут (можно несколько), по умолчанию горячие GET',
+        )
+        parser.add_argument('--user', help='email пользователя для токена')
+        parser.add_argument('--anonymous', action='store_true')
+
+    def handle(self, *args, **options):
+        headers = ''
+        if not options['anonymous']:
+            users = CustomUser.objects.order_by('pk')
+            if options['user']:
+                user = users.filter(email=options['user']).first()
+            else:
+                user = synthetic_users().order_by('pk').first()
+            if user is None:
+                raise CommandError('Нет пользователя; запустите seed_data.')
+            token, _ = Token.objects.get_or_create(user=user)
+            headers = f'Authorization: Token {token.key}\r\n'
+        paths = options['paths'] or read_paths()
+
+        results = {}
+        for target in options['targets']:
+            load = asyncio.run(self.run(target, paths, headers, options))
+            results[target] = load
+            self.report(target, load, options['duration'])
+        if len(results) > 1:
+            base, *others = results.values()
+            for target, load in zip(options['targets'][1:], others):
+                ratio = len(load.timings) / max(1, len(base.timings))
+                self.stdout.write(
+                    f'{target}: x{ratio:.2f} запросов относительно '
+                    f'{options["targets"][0]}'
+                )
+
+    async def run(self, target, paths, headers, options):
+        url = urlsplit(target)
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError(f'Нужен адрес вида http://host:port: {target}')
+        address = (url.hostname, url.port or 80)
+        requests = [
+            (f'GET {quote(path, safe="/?=&%")} HTTP/1.1\r\n'
+             f'Host: {url.netloc}\r\nAccept: application/json\r\n'
+             f'{headers}\r\n').encode()
+            for path in paths
+        ]
+        load = Load()
+        deadline = time.perf_counter() + options['duration']
+        await asyncio.gather(*(
+            self.client(address, requests, number, deadline, load,
+                        options['timeout'])
+            for number in range(options['clients'])
+        ))
+        return load
+
+    async def client(self, address, requests, offset, deadline, load,
+                     timeout):
+        """Клиент с keep-alive; маршруты по кругу со своего смещения."""
+        writer = None
+        number = offset
+        while time.perf_counter() < deadline:
+            request = requests[number % len(requests)]
+            number += 1
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(*address), timeout)
+                status, close = await asyncio.wait_for(
+                    fetch(reader, writer, request), timeout)
+            except NETWORK_ERRORS:
+                load.errors += 1
+                close = True
+            else:
+                load.timings.append((time.perf_counter() - started) * 1000)
+                load.statuses[status] += 1
+            if close and writer is not None:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    def report(self, target, load, duration):
+        timings = sorted(load.timings) or [0]
+        statuses = ', '.join(
+            f'{status}: {count}' for status, count in sorted(
+                load.statuses.items()))
+        self.stdout.write(
+            f'{target}: {len(load.timings) / duration:.1f} запросов/с, '
+            f'p50 {percentile(timings, 50):.1f}  '
+            f'p95 {percentile(timings, 95):.1f}  '
+            f'p99 {percentile(timings, 99):.1f} мс; '
+            f'статусы {statuses or "-"}; ошибок {load.errors}'
+        )
@@ -0,0 +1,63 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.cookable import CookableIndex
+
+
+def synthetic_rows(rows, recipes, ingredients, rng):
+    """Пары (recipe_id, ingredient_id); популярные ингредиенты чаще."""
+    weights = [1 / (rank + 1) for rank in range(ingredients)]
+    per_recipe = min(max(1, rows // recipes), ingredients)
+    for recipe_id in range(1, recipes + 1):
+        chosen = set()
+        while len(chosen) < per_recipe:
+            chosen.update(rng.choices(
+                range(1, ingredients + 1), weights,
+                k=per_recipe - len(chosen)))
+        for ingredient_id in chosen:
+            yield recipe_id, ingredient_id
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the in-memory "what can I cook" index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--ingredients', type=int, default=2_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--pantry', type=int, default=15,
+                            help='ингредиентов в одном запросе')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        rows = list(synthetic_rows(
+            options['rows'], options['recipes'],
+            options['ingredients'], rng,
+        ))
+        index = CookableIndex()
+        started = time.perf_counter()
+        index.build(rows)
+        built = time.perf_counter() - started
+        self.stdout.write(
+            f'build: {len(rows)} rows, {len(index.recipes)} recipes '
+            f'in {built:.2f} s'
+        )
+
+        ingredient_ids = range(1, options['ingredients'] + 1)
+        timings = []
+        for _ in range(options['queries']):
+            pantry = rng.sample(ingredient_ids, options['pantry'])
+            started = time.perf_counter()
+            index.rank(pantry, options['limit'])
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        self.stdout.write(
+            f'query: p50 {timings[len(timings) // 2] * 1000:.1f} ms, '
+            f'p95 {timings[int(len(timings) * 0.95)] * 1000:.1f} ms, '
+            f'max {timings[-1] * 1000:.1f} ms'
+        )
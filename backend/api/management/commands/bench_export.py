@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import resource
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from api.exporters import export_shopping_list
+
+FORMATS = ('pdf', 'csv', 'txt', 'json')
+
+
+def legacy_pdf(shopping_list):
+    """Выгрузка до api.exporters: шрифт на каждый запрос, один лист."""
+    font_path = os.path.join(
+        settings.BASE_DIR,
+        'recipes/fonts/DejaVuSans.ttf'
+    )
+    pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = (
+        'attachment;'
+        'filename="shopping_cart.pdf"'
+    )
+
+    pdf = canvas.Canvas(response, pagesize=letter)
+    pdf.setTitle('Shopping Cart')
+    pdf.setFont("DejaVuSans", 16)
+    pdf.drawString(100, 750, "Ваш список покупок.")
+
+    pdf.setFont("DejaVuSans", 12)
+    y = 700
+    for ingredient_name, measurement_unit, amount in shopping_list:
+        ingredient_string = (
+            f"{ingredient_name}: {amount} {measurement_unit}"
+        )
+        pdf.drawString(100, y, ingredient_string)
+        y -= 20
+
+    pdf.save()
+    return response
+
+
+def export(export_format):
+    def render(shopping_list):
+        return export_shopping_list(iter(shopping_list), export_format)
+    return render
+
+
+def synthetic_list(lines):
+    """Строки get_shopping_list: (ингредиент, единица, итого)."""
+    return [
+        (f'ингредиент {number}', 'г', number * 10)
+        for number in range(lines)
+    ]
+
+
+def max_rss_kib():
+    # В Linux ru_maxrss — в килобайтах.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(render, lines, repeat, connection):
+    """Замер в отдельном процессе: пиковый RSS у каждого свой."""
+    shopping_list = synthetic_list(lines)
+    baseline = max_rss_kib()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = render(shopping_list)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        timings.append((time.perf_counter() - started) * 1000)
+    connection.send((timings, max_rss_kib() - baseline, size))
+    connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Compare shopping list export: old PDF view vs api.exporters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines', type=int, nargs='+', default=[20, 200, 2000],
+            help='строк в списке покупок',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        implementations = [('old pdf', legacy_pdf)] + [
+            (export_format, export(export_format))
+            for export_format in FORMATS
+        ]
+        for lines in options['lines']:
+            self.stdout.write(f'{lines} строк:')
+            for label, render in implementations:
+                timings, rss, size = self.run(
+                    render, lines, options['repeat'])
+                first = timings[0]
+                timings = sorted(timings[1:] or timings)
+                self.stdout.write(
+                    f'  {label:8} first {first:8.2f} ms  '
+                    f'p50 {timings[len(timings) // 2]:8.2f} ms  '
+                    f'max {timings[-1]:8.2f} ms  '
+                    f'peak RSS +{rss / 1024:6.1f} MiB  '
+                    f'{size / 1024:8.1f} KiB'
+                )
+
+    def run(self, render, lines, repeat):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=measure, args=(render, lines, repeat, sender))
+        process.start()
+        sender.close()
+        result = receiver.recv()
+        process.join()
+        return result
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import RECIPES, cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the anonymous recipes cache'
+
+    def handle(self, *args, **kwargs):
+        hits, misses = cache_stats(RECIPES)
+        total = hits + misses
+        ratio = hits / total if total else 0
+        self.stdout.write(
+            f'{RECIPES}: {hits} hits, {misses} misses, '
+            f'hit ratio {ratio:.1%}'
+        )
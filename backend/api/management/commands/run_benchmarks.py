@@ -0,0 +1,201 @@
+import json
+import math
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Favorites, Ingredient, Recipe, RecipeIngredient
+from recipes.models import ShoppingList, Tags
+from recipes.seeding import synthetic_users
+from users.models import CustomUser, Follow
+
+COUNTED = (CustomUser, Recipe, RecipeIngredient, Follow, Favorites,
+           ShoppingList, Ingredient)
+
+
+def percentile(values, rank):
+    """Процентиль по методу ближайшего ранга; values отсортированы."""
+    index = max(0, math.ceil(rank / 100 * len(values)) - 1)
+    return values[index]
+
+
+def server_name():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+    if 'testserver' in hosts or not hosts:
+        return 'testserver'
+    return hosts[0].lstrip('.')
+
+
+def routes(user):
+    """(название, клиент, url) для всех GET-маршрутов api/urls.py."""
+    recipe = (
+        Recipe.objects.filter(is_in_shopping_cart__user=user).first()
+        or Recipe.objects.order_by('pk').first()
+    )
+    if recipe is None:
+        raise CommandError('В базе нет рецептов; запустите seed_data.')
+    author = (
+        Follow.objects.filter(user=user).values_list('author', flat=True)
+        .first() or recipe.author_id
+    )
+    slugs = list(
+        Tags.objects.order_by('pk').values_list('slug', flat=True)[:2])
+    tags = '&'.join(f'tags={slug}' for slug in slugs)
+    pantry = ','.join(
+        str(pk) for pk in recipe.ingredient_used.values_list(
+            'ingredient_id', flat=True)
+    )
+    prefix = Ingredient.objects.order_by('pk').values_list(
+        'name', flat=True).first()[:2]
+    word = recipe.name.split()[0]
+    return [
+        ('recipes', 'anon', '/api/recipes/'),
+        ('recipes', 'auth', '/api/recipes/'),
+        ('recipes?tags', 'auth', f'/api/recipes/?{tags}'),
+        ('recipes?author', 'auth', f'/api/recipes/?author={author}'),
+        ('recipes?is_favorited', 'auth', '/api/recipes/?is_favorited=1'),
+        ('recipes?is_in_shopping_cart', 'auth',
+         '/api/recipes/?is_in_shopping_cart=1'),
+        ('recipes?search', 'auth', f'/api/recipes/?search={word}'),
+        ('recipes?pagination=cursor', 'auth',
+         '/api/recipes/?pagination=cursor'),
+        ('recipe-detail', 'anon', f'/api/recipes/{recipe.pk}/'),
+        ('recipe-detail', 'auth', f'/api/recipes/{recipe.pk}/'),
+        ('recipes/cookable', 'auth',
+         f'/api/recipes/cookable/?ingredients={pantry}'),
+        ('download_shopping_cart.pdf', 'auth',
+         '/api/recipes/download_shopping_cart/?format=pdf'),
+        ('download_shopping_cart.csv', 'auth',
+         '/api/recipes/download_shopping_cart/?format=csv'),
+        ('users', 'auth', '/api/users/'),
+        ('users/me', 'auth', '/api/users/me/'),
+        ('users/subscriptions', 'auth',
+         '/api/users/subscriptions/?recipes_limit=3'),
+        ('tags', 'anon', '/api/tags/'),
+        ('ingredients', 'anon', '/api/ingredients/'),
+        ('ingredients?name', 'anon', f'/api/ingredients/?name={prefix}'),
+    ]
+
+
+def fetch(client, url):
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    response.close()
+    return response
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every API read route through the test client'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='очищать кэш перед каждым запросом',
+        )
+        parser.add_argument('--user', help='email пользователя для запросов')
+        parser.add_argument('--only', help='подстрока названия маршрута')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--compare', help='прошлый JSON-отчёт')
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by('pk')
+        if options['user']:
+            user = users.filter(email=options['user']).first()
+        else:
+            user = synthetic_users().order_by('pk').first() or users.first()
+        if user is None:
+            raise CommandError('Нет пользователей; запустите seed_data.')
+        token, _ = Token.objects.get_or_create(user=user)
+        host = server_name()
+        clients = {'anon': APIClient(SERVER_NAME=host),
+                   'auth': APIClient(SERVER_NAME=host)}
+        clients['auth'].credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        results = {}
+        for name, kind, url in routes(user):
+            if options['only'] and options['only'] not in name:
+                continue
+            label = f'{kind} {name}'
+            results[label] = self.measure(clients[kind], url, options)
+            self.report(label, results[label])
+
+        report = {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'user': user.email,
+            'repeat': options['repeat'],
+            'cold': options['cold'],
+            'rows': {model._meta.label: model.objects.count()
+                     for model in COUNTED},
+            'routes': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Отчёт: {options["output"]}')
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def measure(self, client, url, options):
+        for _ in range(options['warmup']):
+            fetch(client, url)
+        timings = []
+        queries = []
+        for _ in range(options['repeat']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = fetch(client, url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured.captured_queries))
+
+        if options['cold']:
+            cache.clear()
+        tracemalloc.start()
+        fetch(client, url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'queries': round(sum(queries) / len(queries), 1),
+            'peak_alloc_kib': round(peak / 1024, 1),
+        }
+
+    def report(self, label, result):
+        self.stdout.write(
+            f'{label:40} {result["status"]} '
+            f'p50 {result["p50_ms"]:8.2f}  p95 {result["p95_ms"]:8.2f}  '
+            f'p99 {result["p99_ms"]:8.2f} ms  '
+            f'{result["queries"]:5} q  {result["peak_alloc_kib"]:9.1f} KiB'
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)['routes']
+        self.stdout.write(f'Сравнение с {path} (p50, p95, запросы):')
+        for label, result in results.items():
+            before = previous.get(label)
+            if before is None:
+                continue
+            changes = ', '.join(
+                f'{key} {before[key]} -> {result[key]}'
+                for key in ('p50_ms', 'p95_ms', 'queries')
+            )
+            self.stdout.write(f'{label:40} {changes}')
@@ -0,0 +1,220 @@
+"""Метрики запросов: время ответа, SQL-запросы, размер ответа.
+
+Данные копятся в памяти процесса и отдаются в текстовом формате
+Prometheus (см. api.views.MetricsView). У каждого процесса свои
+счётчики, поэтому у всех рядов есть метка pid.
+
+SQL-запросы считает execute_wrapper, установленный на каждое
+соединение; QueryStats текущего запроса он берёт из contextvar.
+Так учитываются и запросы асинхронного ORM, которые выполняются
+в другом потоке со своим соединением.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class QueryStats:
+    """execute_wrapper: число и время SQL-запросов одного HTTP-запроса.
+
+    Повторы одного и того же SQL (с разными параметрами) — признак N+1.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def most_repeated(self):
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+current_stats = ContextVar('query_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_stats(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_stats)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = Counter()
+        self.buckets = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self.duration = Counter()
+        self.queries = Counter()
+        self.query_duration = Counter()
+        self.response_bytes = Counter()
+        self.duplicates = Counter()
+
+    def observe(self, route, method, status, duration, stats, size,
+                duplicated):
+        key = (route, method)
+        with self.lock:
+            self.requests[(route, method, status)] += 1
+            self.buckets[key][bisect_left(DURATION_BUCKETS, duration)] += 1
+            self.duration[key] += duration
+            self.queries[key] += stats.count
+            self.query_duration[key] += stats.duration
+            self.response_bytes[key] += size
+            if duplicated:
+                self.duplicates[key] += 1
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus 0.0.4."""
+        pid = os.getpid()
+        lines = []
+
+        def labels(route, method, **extra):
+            pairs = {'pid': pid, 'route': route, 'method': method, **extra}
+            return ','.join(f'{name}="{value}"'
+                            for name, value in pairs.items())
+
+        def counter(name, help_text, values):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (route, method), value in sorted(values.items()):
+                lines.append(f'{name}{{{labels(route, method)}}} {value}')
+
+        with self.lock:
+            name = 'foodgram_http_requests_total'
+            lines.append(f'# HELP {name} HTTP requests by route and status.')
+            lines.append(f'# TYPE {name} counter')
+            for (route, method, status), value in sorted(
+                    self.requests.items()):
+                lines.append(
+                    f'{name}{{{labels(route, method, status=status)}}} '
+                    f'{value}'
+                )
+
+            name = 'foodgram_http_request_duration_seconds'
+            lines.append(f'# HELP {name} Time to build the response.')
+            lines.append(f'# TYPE {name} histogram')
+            for (route, method), counts in sorted(self.buckets.items()):
+                total = 0
+                for bound, count in zip(
+                        DURATION_BUCKETS + ('+Inf',), counts):
+                    total += count
+                    lines.append(
+                        f'{name}_bucket{{{labels(route, method, le=bound)}}}'
+                        f' {total}'
+                    )
+                lines.append(f'{name}_sum{{{labels(route, method)}}} '
+                             f'{self.duration[(route, method)]:.6f}')
+                lines.append(f'{name}_count{{{labels(route, method)}}} '
+                             f'{total}')
+
+            counter('foodgram_db_queries_total',
+                    'SQL queries executed.', self.queries)
+            counter('foodgram_db_query_seconds_total',
+                    'Time spent in SQL queries.', self.query_duration)
+            counter('foodgram_http_response_bytes_total',
+                    'Response body size (streaming bodies excluded).',
+                    self.response_bytes)
+            counter('foodgram_db_duplicate_query_requests_total',
+                    'Requests that repeated one SQL statement (N+1).',
+                    self.duplicates)
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """Собирает метрики каждого запроса и добавляет Server-Timing."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = settings.METRICS_DUPLICATE_QUERY_THRESHOLD
+        # Соединения, открытые до импорта модуля, сигнал не застал.
+        for connection in connections.all(initialized_only=True):
+            install_query_stats(connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.observe(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.observe(request, response, stats, started)
+
+    def observe(self, request, response, stats, started):
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        sql, repeats = stats.most_repeated()
+        duplicated = repeats >= self.threshold
+        if duplicated:
+            logger.warning(
+                '%s %s: один запрос выполнен %d раз: %.200s',
+                request.method, route, repeats, sql,
+            )
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(
+            route, request.method, response.status_code,
+            duration, stats, size, duplicated,
+        )
+        response['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={stats.duration * 1000:.1f};'
+            f'desc="{stats.count} queries"'
+        )
+        return response
@@ -1,7 +1,64 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+CURSOR_MODE = 'cursor'
 
 
 class DefaultPagination(PageNumberPagination):
     """Кастомный пагинатор для рецептов/пользователей."""
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class KeysetPagination(CursorPagination):
+    """Курсорная пагинация без COUNT(*) и OFFSET.
+
+    Страница выбирается по индексу в порядке ordering,
+    общее количество считается только по ?count=true.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in (
+            '1', 'true', 'True'
+        ):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data['count'] = self.count
+        return response
+
+
+class RecipeCursorPagination(KeysetPagination):
+    """Лента рецептов по (pub_date, id), см. индекс recipe_pub_date_id."""
+    ordering = ('-pub_date', '-id')
+
+
+class UserCursorPagination(KeysetPagination):
+    """Пользователи и подписки по id."""
+    ordering = ('id',)
+
+
+def uses_cursor(request):
+    """Клиент включил курсорный режим (?pagination=cursor или ?cursor=)."""
+    return (request.query_params.get('pagination') == CURSOR_MODE
+            or CURSOR_MODE in request.query_params)
+
+
+class CursorOptInMixin:
+    """Курсорная пагинация по запросу клиента, иначе pagination_class."""
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            if self.cursor_pagination_class and uses_cursor(self.request):
+                pagination_class = self.cursor_pagination_class
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
@@ -0,0 +1,61 @@
+from django.utils.functional import cached_property
+
+from recipes.models import Favorites, ShoppingList
+from users.models import Follow
+
+
+class UserRelations:
+    """Подписки, избранное и список покупок текущего пользователя.
+
+    Каждый набор id загружается одним запросом при первом обращении
+    и дальше проверяется в памяти.
+    """
+    def __init__(self, user):
+        self.user = user
+        self.user_id = user.pk
+
+    def queries(self):
+        return {
+            'followed_author_ids': Follow.objects.filter(
+                user=self.user).values_list('author_id', flat=True),
+            'favorited_recipe_ids': Favorites.objects.filter(
+                user=self.user).values_list('recipe_id', flat=True),
+            'cart_recipe_ids': ShoppingList.objects.filter(
+                user=self.user).values_list('recipe_id', flat=True),
+        }
+
+    def load(self, name):
+        if self.user.is_anonymous:
+            return frozenset()
+        return frozenset(self.queries()[name])
+
+    async def aload(self):
+        """Все наборы сразу, асинхронным ORM (для api.async_views)."""
+        for name, queryset in self.queries().items():
+            if name not in self.__dict__:
+                self.__dict__[name] = frozenset(
+                    [] if self.user.is_anonymous
+                    else [value async for value in queryset]
+                )
+
+    @cached_property
+    def followed_author_ids(self):
+        return self.load('followed_author_ids')
+
+    @cached_property
+    def favorited_recipe_ids(self):
+        return self.load('favorited_recipe_ids')
+
+    @cached_property
+    def cart_recipe_ids(self):
+        return self.load('cart_recipe_ids')
+
+
+def get_user_relations(request):
+    """UserRelations, общий для всех сериализаторов одного запроса."""
+    http_request = getattr(request, '_request', request)
+    relations = getattr(http_request, 'user_relations', None)
+    if relations is None or relations.user_id != request.user.pk:
+        relations = UserRelations(request.user)
+        http_request.user_relations = relations
+    return relations
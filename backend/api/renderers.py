@@ -0,0 +1,63 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Формат выгрузки списка покупок.
+
+    Нужен для выбора формата через ?format= или Accept.
+    Сам документ собирает api.exporters, здесь рендерятся только ошибки.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json; charset=utf-8'
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class TextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class JSONExportRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+
+SHOPPING_LIST_RENDERERS = (
+    PDFRenderer, CSVRenderer, TextRenderer, JSONExportRenderer,
+)
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Текстовый формат Prometheus; ошибки доступа — JSON."""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if isinstance(data, str):
+            if response is not None:
+                response['Content-Type'] = self.content_type
+            return data.encode(self.charset)
+        if response is not None:
+            response['Content-Type'] = 'application/json; charset=utf-8'
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
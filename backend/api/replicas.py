@@ -0,0 +1,123 @@
+"""Чтение из реплик БД (settings.REPLICA_DATABASES).
+
+Роутер отправляет чтение туда, куда указывает contextvar
+read_database; вне запросов она пуста, и всё идёт в default.
+Переменную выставляет ReplicaReadMixin на время безопасного запроса
+к ViewSet'у (и async_view для асинхронных обработчиков). Запись, миграции,
+команды и воркер работают только с default.
+
+После записи пользователя (избранное, корзина, подписка, рецепт)
+его чтение REPLICA_STICKY_SECONDS идёт в default, чтобы он видел
+свои изменения, пока реплика догоняет. Отметка хранится в кэше
+Django, при нескольких процессах нужен общий бэкенд.
+
+Кэши, общие для всех (снимки справочников, ответы для гостей,
+индексы в памяти), и кэши под версией данных (выгрузка корзины)
+заполняются из default: прочитанное с отстающей реплики хранилось бы
+в них до следующего изменения.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.permissions import SAFE_METHODS
+
+read_database = ContextVar('read_database', default=None)
+
+
+def sticky_key(user_id):
+    return f'primary_reads:{user_id}'
+
+
+def stick_to_primary(user_id):
+    """Чтение пользователя — из default, пока реплики не догонят."""
+    if settings.REPLICA_DATABASES:
+        transaction.on_commit(lambda: cache.set(
+            sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS))
+
+
+def replica_for(user):
+    """Реплика для пользователя без учёта недавних записей.
+
+    Пользователь всегда читает из одной реплики, чтобы при разном
+    отставании реплик данные не «откатывались» между запросами.
+    """
+    replicas = settings.REPLICA_DATABASES
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    if not user.is_authenticated:
+        return random.choice(replicas)
+    return replicas[user.pk % len(replicas)]
+
+
+def choose_replica(user):
+    """Реплика (или default) для чтения в этом запросе."""
+    if (settings.REPLICA_DATABASES and user.is_authenticated
+            and cache.get(sticky_key(user.pk))):
+        return DEFAULT_DB_ALIAS
+    return replica_for(user)
+
+
+async def achoose_replica(user):
+    if (settings.REPLICA_DATABASES and user.is_authenticated
+            and await cache.aget(sticky_key(user.pk))):
+        return DEFAULT_DB_ALIAS
+    return replica_for(user)
+
+
+@contextmanager
+def reading_from(database):
+    token = read_database.set(database)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+def primary():
+    """Чтение из default внутри блока with."""
+    return reading_from(DEFAULT_DB_ALIAS)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему на реплики переносит репликация.
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """Безопасные запросы к ViewSet'у читают из реплики.
+
+    replica_actions ограничивает действия, None — все.
+    """
+    replica_actions = None
+
+    def reads_replica(self, request):
+        return request.method in SAFE_METHODS and (
+            self.replica_actions is None
+            or self.action in self.replica_actions)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.reads_replica(request):
+            self.replica_token = read_database.set(
+                choose_replica(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, 'replica_token', None)
+        if token is not None:
+            read_database.reset(token)
+            self.replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -4,13 +4,23 @@ import uuid
 from rest_framework import serializers
 from rest_framework.fields import IntegerField
 from rest_framework.relations import SlugRelatedField
+from rest_framework.reverse import reverse
+from django.conf import settings
 from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer
+from PIL import Image
 
+from jobs.models import Job
 from recipes.models import ShoppingList, Favorites, RecipeIngredient
 from recipes.models import Recipe, Tags, Ingredient
+from recipes.images import delete_renditions, rendition_urls
+from recipes.images import schedule_renditions
 from users.models import CustomUser, Follow
+from .exporters import CONTENT_TYPES
+from .relations import get_user_relations
+from .signals import recipe_ingredients_changed
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -57,15 +67,8 @@ class CustomUserCViewSerializer(UserCreateSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Follow.objects.filter(user=user, author=obj).exists()
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation['is_subscribed'] = self.get_is_subscribed(instance)
-        return representation
+        relations = get_user_relations(self.context.get('request'))
+        return obj.id in relations.followed_author_ids
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -78,16 +81,65 @@ class TagSerializer(serializers.ModelSerializer):
 class Base64ImageField(serializers.ImageField):
     """Сериализатор для изображений."""
     def to_internal_value(self, data):
+        max_size = settings.IMAGE_MAX_UPLOAD_SIZE
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
+            # Размер проверяется до декодирования: 4 символа = 3 байта.
+            if len(imgstr) * 3 // 4 > max_size:
+                raise serializers.ValidationError(
+                    f'Размер изображения больше {max_size} байт.'
+                )
             ext = format.split('/')[-1]
             filename = f"{uuid.uuid4()}.{ext}"
             decoded_file = base64.b64decode(imgstr)
             data = ContentFile(decoded_file, name=filename)
         elif isinstance(data, bytes):
             data = ContentFile(data, name=f"{uuid.uuid4()}.jpg")
+        if isinstance(data, ContentFile):
+            self.validate_image(data, max_size)
         return super().to_internal_value(data)
 
+    @staticmethod
+    def validate_image(data, max_size):
+        """Проверка размера файла и сторон изображения по заголовку."""
+        if data.size > max_size:
+            raise serializers.ValidationError(
+                f'Размер изображения больше {max_size} байт.'
+            )
+        try:
+            width, height = Image.open(data).size
+        except (OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(
+                'Загрузите правильное изображение.'
+            )
+        finally:
+            data.seek(0)
+        max_dimension = settings.IMAGE_MAX_DIMENSION
+        if max(width, height) > max_dimension:
+            raise serializers.ValidationError(
+                f'Стороны изображения должны быть не больше '
+                f'{max_dimension} пикселей.'
+            )
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения (thumb, card, full)."""
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        urls = rendition_urls(recipe.image, recipe.renditions_ready)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {
+                rendition: request.build_absolute_uri(url)
+                for rendition, url in urls.items()
+            }
+        return urls
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для ингредиентов."""
@@ -158,6 +210,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField()
     author = CustomUserCViewSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -170,12 +223,13 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time',
         )
 
     def get_ingredients(self, obj):
-        ingredients_data = RecipeIngredient.objects.filter(recipe=obj)
+        ingredients_data = obj.ingredient_used.all()
         ingredient_serializer = IngredientInRecipeViewSerializer(
             instance=ingredients_data,
             many=True
@@ -183,12 +237,12 @@ class RecipeSerializer(serializers.ModelSerializer):
         return ingredient_serializer.data
 
     def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        return obj.favorites_recipe.filter(user=user).exists()
+        relations = get_user_relations(self.context['request'])
+        return obj.id in relations.favorited_recipe_ids
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        return obj.is_in_shopping_cart.filter(user=user).exists()
+        relations = get_user_relations(self.context['request'])
+        return obj.id in relations.cart_recipe_ids
 
 
 class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
@@ -208,70 +262,110 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
             'text', 'tags', 'cooking_time', 'ingredients',
         )
 
-    def add_ingredient(self, recipe, ingredient_id, amount):
-        """Метод добавления ингредиента."""
-        ingredient = get_object_or_404(Ingredient, id=ingredient_id)
-        try:
-            recipe_ingredient = RecipeIngredient.objects.get(
-                recipe=recipe,
-                ingredient=ingredient
+    def validate_ingredients(self, value):
+        """Проверка ингредиентов одним запросом, повторы суммируются."""
+        amounts = {}
+        for ingredient_data in value:
+            ingredient_id = ingredient_data['id']
+            amounts[ingredient_id] = (
+                amounts.get(ingredient_id, 0) + ingredient_data['amount']
             )
-            recipe_ingredient.amount += amount
-            recipe_ingredient.save()
-        except RecipeIngredient.DoesNotExist:
-            recipe_ingredient = RecipeIngredient(
-                recipe=recipe,
-                ingredient=ingredient,
-                amount=amount
+        found = set(
+            Ingredient.objects.filter(id__in=amounts)
+            .values_list('id', flat=True)
+        )
+        missing = sorted(set(amounts) - found)
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {missing}'
             )
-            recipe_ingredient.save()
-        return recipe_ingredient
-
-    def create_tags(self, tags, recipe):
-        """Метод добавления тега"""
-
-        recipe.tags.set(tags)
-
+        return [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in amounts.items()
+        ]
+
+    def set_ingredients(self, recipe, ingredients_data, existing=()):
+        """Синхронизация ингредиентов рецепта пакетными запросами.
+
+        Новые строки создаются, изменённые обновляются, лишние удаляются,
+        неизменённые не трогаются.
+        """
+        existing = {item.ingredient_id: item for item in existing}
+        to_create, to_update = [], []
+        for ingredient_data in ingredients_data:
+            ingredient_id = ingredient_data['id']
+            amount = ingredient_data['amount']
+            recipe_ingredient = existing.pop(ingredient_id, None)
+            if recipe_ingredient is None:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                ))
+            elif recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+        if existing:
+            RecipeIngredient.objects.filter(
+                id__in=[item.id for item in existing.values()]
+            ).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        if to_create or to_update:
+            recipe_ingredients_changed(recipe.id)
+
+    @transaction.atomic
     def create(self, validated_data):
         """Создание рецепта."""
-        author = self.context.get('request').user
+        validated_data['author'] = self.context.get('request').user
         tags = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
 
         recipe = super().create(validated_data)
-        recipe.author = author
-        recipe.save()
-
-        self.create_tags(tags, recipe)
-
-        for ingredient_data in ingredients_data:
-            ingredient_id = ingredient_data['id']
-            amount = ingredient_data['amount']
-            self.add_ingredient(recipe, ingredient_id, amount)
-
+        recipe.tags.set(tags)
+        self.set_ingredients(recipe, ingredients_data)
+        if recipe.image:
+            schedule_renditions(recipe.image.name)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Обновление рецепта."""
-        instance.tags.clear()
-        instance.tags.set(validated_data.pop('tags'))
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        ingredients_data = validated_data.pop('ingredients')
-        for ingredient_data in ingredients_data:
-            ingredient_id = ingredient_data['id']
-            amount = ingredient_data['amount']
-            self.add_ingredient(instance, ingredient_id, amount)
+        tags = validated_data.pop('tags', None)
+        if tags is not None:
+            instance.tags.set(tags)
+        ingredients_data = validated_data.pop('ingredients', None)
+        if ingredients_data is not None:
+            self.set_ingredients(
+                instance,
+                ingredients_data,
+                RecipeIngredient.objects.filter(recipe=instance)
+            )
 
         image_data = validated_data.get('image')
         if image_data:
             if instance.image:
+                delete_renditions(instance.image.name)
                 instance.image.delete()
             instance.image = image_data
+            instance.renditions_ready = False
 
         super().update(instance, validated_data)
+        if image_data:
+            schedule_renditions(instance.image.name)
         return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'ingredient_used',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
         return RecipeSerializer(instance,
                                 context=self.context).data
 
@@ -281,6 +375,7 @@ class PublicRecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserCreateSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField()
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -291,12 +386,13 @@ class PublicRecipeSerializer(serializers.ModelSerializer):
             'name',
             'ingredients',
             'image',
+            'images',
             'text',
             'cooking_time',
         )
 
     def get_ingredients(self, obj):
-        ingredients_data = RecipeIngredient.objects.filter(recipe=obj)
+        ingredients_data = obj.ingredient_used.all()
         ingredient_serializer = IngredientInRecipeViewSerializer(
             instance=ingredients_data,
             many=True
@@ -307,6 +403,7 @@ class PublicRecipeSerializer(serializers.ModelSerializer):
 class MiniRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для краткого представления."""
     image = Base64ImageField()
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -314,10 +411,20 @@ class MiniRecipeSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
 
 
+def get_recipes_limit(request):
+    """Параметр recipes_limit; None, если не задан или некорректен."""
+    try:
+        recipes_limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError):
+        return None
+    return recipes_limit if recipes_limit > 0 else None
+
+
 class FollowSerializer(serializers.ModelSerializer):
     """Сериализатор для подписки на авторов."""
     is_subscribed = serializers.SerializerMethodField(
@@ -337,23 +444,26 @@ class FollowSerializer(serializers.ModelSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Follow.objects.filter(user=user, author=obj).exists()
+        # Список подписок строится по подпискам самого пользователя.
+        if self.context.get('subscriptions'):
+            return True
+        relations = get_user_relations(self.context.get('request'))
+        return obj.id in relations.followed_author_ids
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
-        return MiniRecipeSerializer(recipes, many=True).data
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit:
+                recipes = recipes[:recipes_limit]
+        return MiniRecipeSerializer(
+            recipes, many=True, context=self.context).data
 
     @staticmethod
     def get_recipes_count(obj):
-        """Метод для получения количества рецептов"""
-        return obj.recipes.count()
+        """Количество рецептов из счётчика автора."""
+        return obj.recipes_count
 
 
 class FollowViewSerializer(serializers.ModelSerializer):
@@ -366,3 +476,29 @@ class FollowViewSerializer(serializers.ModelSerializer):
         return FollowSerializer(instance.author, context={
             'request': self.context.get('request')
         }).data
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Состояние фоновой задачи; download — ссылка на готовый файл."""
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'params', 'status', 'attempts',
+                  'created', 'finished', 'download')
+
+    def get_download(self, obj):
+        if obj.status != Job.DONE or not obj.result:
+            return None
+        return reverse(
+            'jobs-download', args=[obj.pk],
+            request=self.context.get('request'),
+        )
+
+
+class ShoppingCartJobSerializer(serializers.Serializer):
+    """Заказ выгрузки списка покупок."""
+    kind = serializers.ChoiceField(choices=('shopping_cart',))
+    format = serializers.ChoiceField(
+        choices=tuple(CONTENT_TYPES), default='pdf'
+    )
@@ -0,0 +1,140 @@
+from threading import local
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Favorites, Ingredient, Recipe, RecipeIngredient
+from recipes.models import ShoppingList, Tags
+from recipes.search import index_recipe, unindex_recipe
+from recipes.signals import ingredients_loaded, recipes_loaded
+from recipes.signals import renditions_ready
+from users.models import CustomUser, Follow
+from .authentication import token_cache
+from .cache import INGREDIENTS, RECIPES, TAGS, bump_version
+from .cache import shopping_cart_name
+from .cookable import cookable_index, reset_index
+from .replicas import stick_to_primary
+
+_pending = local()
+
+
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+def shopping_list_changed(sender, instance, **kwargs):
+    """Рецепт добавлен в список покупок или удалён из него."""
+    bump_version(shopping_cart_name(instance.user_id))
+
+
+def bump_shopping_carts(recipe_ids):
+    """Сбрасывает списки покупок всех, у кого в корзине эти рецепты."""
+    user_ids = set(
+        ShoppingList.objects.filter(recipe_id__in=recipe_ids)
+        .values_list('user_id', flat=True)
+    )
+    if user_ids:
+        bump_version(*(shopping_cart_name(user_id) for user_id in user_ids))
+
+
+def flush_recipe_changes():
+    recipe_ids = _pending.__dict__.pop('recipe_ids', None)
+    if recipe_ids:
+        bump_shopping_carts(recipe_ids)
+        cookable_index.apply(recipe_ids)
+
+
+def recipe_ingredients_changed(recipe_id):
+    """Изменился состав рецепта, который может быть в корзинах.
+
+    Рецепты копятся до коммита транзакции, затем одним запросом
+    сбрасываются корзины и обновляется индекс api.cookable.
+    Массовые операции (bulk_create/bulk_update) вызывают эту функцию сами.
+    """
+    _pending.__dict__.setdefault('recipe_ids', set()).add(recipe_id)
+    transaction.on_commit(flush_recipe_changes)
+    transaction.on_commit(recipes_changed)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    recipe_ingredients_changed(instance.recipe_id)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(ingredients_loaded)
+def ingredient_changed(sender, **kwargs):
+    """Изменился справочник ингредиентов."""
+    bump_version(INGREDIENTS, RECIPES)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(renditions_ready)
+def recipes_changed(**kwargs):
+    """Изменился каталог рецептов: кэш ответов для гостей устарел."""
+    bump_version(RECIPES)
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+def tags_changed(sender, **kwargs):
+    bump_version(TAGS)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    index_recipe(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    unindex_recipe(instance.pk)
+
+
+@receiver(recipes_loaded)
+def recipes_bulk_loaded(sender, **kwargs):
+    """Массовая загрузка: сбрасываются каталог и индекс api.cookable."""
+    bump_version(INGREDIENTS, RECIPES, TAGS)
+    reset_index()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Выход (delete_token) или удаление пользователя."""
+    token_cache.forget(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    """Смена пароля или деактивация: токен перечитается из БД.
+
+    Сохранения только других полей (last_login при входе) кэш
+    не сбрасывают.
+    """
+    if created:
+        return
+    if update_fields is None or {'password', 'is_active'} & update_fields:
+        token_cache.forget_user(instance.pk)
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_delete, sender=Favorites)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def user_wrote(sender, instance, **kwargs):
+    """Пользователь должен сразу видеть свои изменения (api.replicas)."""
+    stick_to_primary(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def author_wrote(sender, instance, **kwargs):
+    stick_to_primary(instance.author_id)
@@ -0,0 +1,13 @@
+from jobs.queue import task
+from recipes.services import get_shopping_list
+from .exporters import FILENAME, render_document
+
+
+@task('shopping_cart', timeout=300)
+def export_shopping_cart(job):
+    """Список покупок пользователя в формате job.params['format']."""
+    export_format = job.params['format']
+    document = render_document(
+        get_shopping_list(job.user).iterator(), export_format
+    )
+    return f'{FILENAME}.{export_format}', document
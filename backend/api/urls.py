@@ -3,7 +3,7 @@ from django.conf.urls.static import static
 from django.urls import include, re_path
 from rest_framework.routers import DefaultRouter
 
-from .views import CustomUserViewSet
+from .views import CustomUserViewSet, JobsViewSet, MetricsView
 from .views import RecipesViewSet, TagsViewSet, IngredientsViewSet
 
 router = DefaultRouter()
@@ -11,8 +11,31 @@ router.register(r'users', CustomUserViewSet, basename='users')
 router.register(r'recipes', RecipesViewSet)
 router.register(r'tags', TagsViewSet)
 router.register(r'ingredients', IngredientsViewSet)
+router.register(r'jobs', JobsViewSet, basename='jobs')
 
 urlpatterns = [
+    re_path(r'^metrics/$', MetricsView.as_view(), name='metrics'),
+]
+
+
+def async_urlpatterns():
+    """Асинхронные обработчики GET перед теми же ViewSet'ами router."""
+    from .async_views import ROUTES, async_view
+
+    return [
+        re_path(url.pattern.regex.pattern,
+                async_view(ROUTES[url.name], url.callback), name=url.name)
+        for url in router.urls
+        if url.name in ROUTES and 'format' not in url.pattern.regex.groupindex
+    ]
+
+
+# Под ASGI чтение обслуживают асинхронные обработчики,
+# остальные методы — те же ViewSet'ы, что и в router.urls.
+if settings.ASYNC_API:
+    urlpatterns += async_urlpatterns()
+
+urlpatterns += [
     re_path('', include(router.urls)),
     re_path('auth/', include('djoser.urls')),
     re_path('auth/', include('djoser.urls.authtoken')),
@@ -1,7 +1,9 @@
 import os
 
 from django.conf import settings
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from rest_framework.authtoken.models import Token
@@ -9,36 +11,71 @@ from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from django.utils.cache import get_conditional_response
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 
+from .authentication import token_cache
+from .autocomplete import ingredient_index
+from .cookable import cookable_index
+from .cache import INGREDIENTS, RECIPES, TAGS, Snapshot
+from .cache import cache_response, get_version, last_modified
+from .cache import record_cache_access, recipes_cache_key
+from .cache import shopping_cart_etag, shopping_cart_key, shopping_cart_name
+from .exporters import document_response, export_shopping_list
 from .filters import RecipeFilter, IngredientFilter
+from jobs.models import Job
+from jobs.queue import enqueue
 from recipes.models import Recipe, Tags, Ingredient, ShoppingList
 from recipes.models import Favorites, RecipeIngredient
+from recipes.services import get_shopping_list
 from .permissions import IsAuthorOrReadOnly, IsAdminOrReadOnly
-from .pagination import DefaultPagination
+from .pagination import CursorOptInMixin, DefaultPagination
+from .pagination import RecipeCursorPagination, UserCursorPagination
+from .metrics import registry
+from .renderers import SHOPPING_LIST_RENDERERS, PrometheusRenderer
+from .replicas import ReplicaReadMixin, primary
 from .serializers import RecipeSerializer, TagSerializer
 from .serializers import IngredientSerializer, PublicRecipeSerializer
-from .serializers import CreateUpdateRecipeSerializer
+from .serializers import CreateUpdateRecipeSerializer, MiniRecipeSerializer
 from users.models import CustomUser, Follow
 from .serializers import FollowSerializer, CustomUserCreateSerializer
 from .serializers import FollowViewSerializer, CustomUserCViewSerializer
+from .serializers import get_recipes_limit
+from .serializers import JobSerializer, ShoppingCartJobSerializer
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(ReplicaReadMixin, CursorOptInMixin,
+                     viewsets.ModelViewSet):
     """ViewSet для просмотра и управления рецептами."""
     queryset = Recipe.objects.all()
     permission_classes = (
         IsAuthorOrReadOnly | IsAdminOrReadOnly,
     )
+    # download_shopping_cart читает из default: документ кэшируется под
+    # версией корзины, и список с отстающей реплики отдавался бы до
+    # истечения SHOPPING_CART_CACHE_TIMEOUT.
+    replica_actions = ('list', 'retrieve', 'cookable')
     pagination_class = DefaultPagination
+    cursor_pagination_class = RecipeCursorPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """Рецепты вместе с авторами, тегами и ингредиентами."""
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_used',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
     def get_serializer_class(self):
         """Выбор сериализатора в зависимости от метода."""
         if self.action in ('create', 'partial_update'):
@@ -48,13 +85,38 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 return PublicRecipeSerializer
         return RecipeSerializer
 
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
+    def cached(self, handler, request, *args, **kwargs):
+        """Ответ для гостя из кэша, общий для всех анонимных запросов."""
+        key = recipes_cache_key(request, self.action, kwargs.get('pk'))
+        data = cache.get(key)
+        record_cache_access(RECIPES, data is not None)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        with primary():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RECIPES_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def create(self, request, *args, **kwargs):
         """Создание рецепта."""
         serializer = self.get_serializer(data=request.data)
-        print(request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         recipe_id = serializer.instance.id
@@ -166,83 +228,121 @@ class RecipesViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-    @action(detail=False, methods=['get'])
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS
+    )
     def download_shopping_cart(self, request):
-        """Скачивание списка покупок."""
+        """Скачивание списка покупок (pdf, csv, txt или json)."""
         user = request.user
-        recipes_in_shopping_cart = (
-            ShoppingList.objects.filter(user=user).
-            values_list('recipe', flat=True)
-        )
-        font_path = os.path.join(
-            settings.BASE_DIR,
-            'recipes/fonts/DejaVuSans.ttf'
-        )
-        pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = (
-            'attachment;'
-            'filename="shopping_cart.pdf"'
+        export_format = request.accepted_renderer.format
+        version = get_version(shopping_cart_name(user.id))
+        etag = shopping_cart_etag(user.id, export_format, version)
+        modified = last_modified(shopping_cart_name(user.id))
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified
         )
-
-        pdf = canvas.Canvas(response, pagesize=letter)
-        pdf.setTitle('Shopping Cart')
-        pdf.setFont("DejaVuSans", 16)
-        pdf.drawString(100, 750, "Ваш список покупок.")
-        ingredient_list = []
-
-        for recipe_id in recipes_in_shopping_cart:
-            recipe = Recipe.objects.get(pk=recipe_id)
-            pdf.setFont("DejaVuSans", 12)
-
-            ingredients = RecipeIngredient.objects.filter(recipe=recipe)
-            for ingredient in ingredients:
-                ingredient_name = ingredient.ingredient.name
-                ingredient_amount = ingredient.amount
-                measurement_unit = ingredient.ingredient.measurement_unit
-
-                existing_ingredient = next((
-                    i for i in ingredient_list if i['name'] == ingredient_name
+        if response is not None:
+            patch_vary_headers(response, ('Accept',))
+            return response
+
+        key = shopping_cart_key(user.id, export_format, version)
+        document = cache.get(key)
+        if document is not None:
+            response = document_response(document, export_format)
+        else:
+            response = cache_response(
+                export_shopping_list(
+                    get_shopping_list(user).iterator(),
+                    export_format
                 ),
-                    None
-                )
+                key,
+                settings.SHOPPING_CART_CACHE_TIMEOUT
+            )
+        response['ETag'] = etag
+        if modified is not None:
+            response['Last-Modified'] = http_date(modified)
+        # Формат выбирается и по Accept: прокси не должен отдать
+        # другому клиенту документ в чужом формате.
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+    @action(detail=False, methods=['get'])
+    def cookable(self, request):
+        """Что можно приготовить из имеющихся ингредиентов.
 
-                if existing_ingredient:
-                    existing_ingredient['amount'] += ingredient_amount
-                else:
-                    ingredient_list.append({
-                        'name': ingredient_name,
-                        'amount': ingredient_amount,
-                        'measurement_unit': measurement_unit,
-                    })
-
-        pdf.setFont("DejaVuSans", 12)
-        y = 700
-        for ingredient in ingredient_list:
-            ingredient_name = ingredient['name']
-            ingredient_amount = ingredient['amount']
-            measurement_unit = ingredient['measurement_unit']
-            ingredient_string = (
-                f"{ingredient_name}: {ingredient_amount} {measurement_unit}"
+        ?ingredients=1,2,3 — id ингредиентов; рецепты упорядочены по доле
+        имеющихся ингредиентов, missing — сколько ещё не хватает.
+        """
+        try:
+            ingredient_ids = {
+                int(value)
+                for param in request.query_params.getlist('ingredients')
+                for value in param.split(',') if value.strip()
+            }
+        except ValueError:
+            return Response(
+                {'detail': 'Ингредиенты задаются списком id.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            pdf.drawString(100, y, ingredient_string)
-            y -= 20
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = settings.COOKABLE_LIMIT
+        limit = max(1, min(limit, settings.COOKABLE_LIMIT))
+        ranked = cookable_index.search(ingredient_ids, limit)
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in ranked]
+        )
+        context = self.get_serializer_context()
+        return Response([
+            {
+                'recipe': MiniRecipeSerializer(
+                    recipes[recipe_id], context=context).data,
+                'coverage': round(coverage, 4),
+                'missing': missing,
+            }
+            for recipe_id, coverage, missing in ranked
+            if recipe_id in recipes
+        ])
+
+
+def snapshot_response(request, snapshot):
+    """Ответ из снимка справочника с ETag; при совпадении — 304."""
+    content, etag = snapshot.get()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(
+        response, public=True, max_age=settings.CATALOGUE_MAX_AGE
+    )
+    return response
 
-        pdf.save()
-        return response
 
+tags_snapshot = Snapshot(TAGS, lambda: JSONRenderer().render(
+    TagSerializer(Tags.objects.all(), many=True).data
+))
+ingredients_snapshot = Snapshot(INGREDIENTS, lambda: JSONRenderer().render(
+    list(Ingredient.objects.order_by('id').values(
+        'id', 'name', 'measurement_unit'
+    ))
+))
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagsViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для работы с тегами."""
     queryset = Tags.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
+    # Справочник только для чтения: токен проверять незачем.
+    authentication_classes = ()
 
     def list(self, request):
         """Получение списка тегов."""
-        tags = self.get_queryset()
-        serializer = self.get_serializer(tags, many=True)
-        return Response(serializer.data)
+        return snapshot_response(request, tags_snapshot)
 
     @action(detail=True, methods=['GET'])
     def tag_detail(self, request, pk=None):
@@ -252,20 +352,33 @@ class TagsViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet для работы с ингредиентыми."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = [IngredientFilter, ]
     search_fields = ['^name', ]
+    authentication_classes = ()
+
+    def list(self, request, *args, **kwargs):
+        """Поиск ингредиентов по началу названия из индекса в памяти."""
+        name = request.query_params.get(IngredientFilter.search_param)
+        if name:
+            return Response(ingredient_index.search(
+                name, settings.INGREDIENT_SEARCH_LIMIT
+            ))
+        return snapshot_response(request, ingredients_snapshot)
 
 
-class CustomUserViewSet(DjoserUserViewSet):
+class CustomUserViewSet(ReplicaReadMixin, CursorOptInMixin,
+                        DjoserUserViewSet):
     """ViewSet для управления пользователями."""
+    replica_actions = ('list_subscriptions',)
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserCreateSerializer
     pagination_class = DefaultPagination
+    cursor_pagination_class = UserCursorPagination
     permission_classes = (IsAuthenticated, )
 
     def get_serializer_class(self):
@@ -407,12 +520,88 @@ class CustomUserViewSet(DjoserUserViewSet):
 
     @action(detail=False, methods=['GET'], url_path='subscriptions')
     def list_subscriptions(self, request):
-        user = request.user
-        print(user)
-        queryset = CustomUser.objects.filter(following__user=user)
-        print(queryset)
-        page = self.paginate_queryset(queryset)
-        serializer = FollowSerializer(
-            page, many=True, context={'request': request}
+        """Подписки с последними рецептами авторов."""
+        page = self.paginate_queryset(self.get_subscriptions())
+        return self.get_paginated_response(
+            self.get_subscriptions_serializer(page).data)
+
+    def get_subscriptions(self):
+        """Авторы, на которых подписан пользователь.
+
+        Первые recipes_limit рецептов всех авторов страницы выбираются
+        одним запросом (ROW_NUMBER() OVER (PARTITION BY author)),
+        количество рецептов берётся из счётчика автора.
+        """
+        recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(self.request)
+        if recipes_limit:
+            recipes = recipes[:recipes_limit]
+        return (
+            CustomUser.objects.filter(following__user=self.request.user)
+            .prefetch_related(Prefetch(
+                'recipes', queryset=recipes, to_attr='latest_recipes'
+            ))
+            .order_by('id')
+        )
+
+    def get_subscriptions_serializer(self, page):
+        return FollowSerializer(
+            page, many=True,
+            context={'request': self.request, 'subscriptions': True}
+        )
+
+
+class JobsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Фоновые задачи пользователя: заказ, опрос и скачивание результата.
+
+    POST {"kind": "shopping_cart", "format": "pdf"} ставит выгрузку
+    в очередь и сразу отвечает 202; когда status станет done,
+    файл отдаётся по ссылке download.
+    """
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = DefaultPagination
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    def create(self, request):
+        serializer = ShoppingCartJobSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue(
+            serializer.validated_data['kind'],
+            user=request.user,
+            format=serializer.validated_data['format'],
+        )
+        return Response(
+            self.get_serializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse(
+                'jobs-detail', args=[job.pk], request=request
+            )},
+        )
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Результат готовой задачи."""
+        job = self.get_object()
+        if job.status != Job.DONE or not job.result:
+            return Response(
+                {'detail': 'Результат ещё не готов.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        extension = os.path.splitext(job.result.name)[1]
+        return FileResponse(
+            job.result.open('rb'),
+            as_attachment=True,
+            filename=f'{job.kind}{extension}',
         )
-        return self.get_paginated_response(serializer.data)
+
+
+class MetricsView(APIView):
+    """Метрики процесса в формате Prometheus, только для персонала."""
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request):
+        return Response(registry.render() + token_cache.render())
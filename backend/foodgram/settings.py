@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -55,6 +57,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,6 +86,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+# Асинхронные обработчики чтения (api.async_views); включает asgi.py.
+ASYNC_API = os.environ.get('ASYNC_API', default=False) == 'True'
 
 
 # Database
@@ -98,6 +105,45 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: DB_REPLICA_HOSTS=host[:port],...
+# Имя БД, пользователь и пароль реплик — DB_REPLICA_NAME, DB_REPLICA_USER,
+# DB_REPLICA_PASSWORD (по умолчанию как у default).
+# Чтение каталога идёт в них (api.replicas), запись — в default.
+REPLICA_SETTINGS = {
+    **DATABASES['default'],
+    'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+    'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+    'PASSWORD': os.getenv(
+        'DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+    'TEST': {'MIRROR': 'default'},
+}
+REPLICA_ALIASES = []
+for number, address in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica{number}'] = {
+        **REPLICA_SETTINGS,
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+    }
+    REPLICA_ALIASES.append(f'replica{number}')
+# Псевдонимы из DATABASES для чтения. Переопределяются переменной
+# REPLICA_DATABASES=alias,... или в settings окружения, где реплики
+# описаны в DATABASES вручную (см. tests/settings.py).
+REPLICA_DATABASES = [
+    alias.strip() for alias in os.getenv(
+        'REPLICA_DATABASES', ','.join(REPLICA_ALIASES)).split(',')
+    if alias.strip()
+]
+if set(REPLICA_DATABASES) - set(DATABASES):
+    raise ImproperlyConfigured(
+        'REPLICA_DATABASES: нет таких баз в DATABASES: '
+        + ', '.join(sorted(set(REPLICA_DATABASES) - set(DATABASES)))
+    )
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# Сколько секунд после записи пользователь читает из default.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -143,16 +189,88 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Images
+IMAGE_MAX_UPLOAD_SIZE = int(os.getenv('IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 ** 2))
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', 5000))
+IMAGE_RENDITION_FORMAT = os.getenv('IMAGE_RENDITION_FORMAT', 'WEBP')
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Cache
+# CACHE_BACKEND: locmem (по умолчанию), file или redis.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache'),
+    ),
+    'redis': (
+        'django.core.cache.backends.redis.RedisCache',
+        'redis://127.0.0.1:6379',
+    ),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.getenv('CACHE_BACKEND', 'locmem')
+]
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_LOCATION),
+    }
+}
+# Версии кэша (api.cache) и журнал api.cookable должны быть общими
+# для всех процессов, а locmem у каждого процесса свой.
+# WEB_CONCURRENCY — число воркеров gunicorn.
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+if CACHE_BACKEND == CACHE_BACKENDS['locmem'][0] and WEB_CONCURRENCY > 1:
+    raise ImproperlyConfigured(
+        'CACHE_BACKEND=locmem не подходит для нескольких процессов '
+        '(WEB_CONCURRENCY > 1): используйте redis или file.'
+    )
+
+SHOPPING_CART_CACHE_TIMEOUT = int(
+    os.getenv('SHOPPING_CART_CACHE_TIMEOUT', 60 * 60)
+)
+
+RECIPES_CACHE_TIMEOUT = int(os.getenv('RECIPES_CACHE_TIMEOUT', 5 * 60))
+
+# Сколько секунд клиент может не перепроверять теги и ингредиенты.
+CATALOGUE_MAX_AGE = int(os.getenv('CATALOGUE_MAX_AGE', 60))
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+# Сколько рецептов отдаёт /api/recipes/cookable/ (и максимум для limit).
+COOKABLE_LIMIT = int(os.getenv('COOKABLE_LIMIT', 20))
+
+# Фоновые задачи (jobs): JOBS_EAGER=True выполняет их сразу в процессе
+# запроса, без воркера; повтор — через JOBS_RETRY_DELAY * 2^n секунд.
+JOBS_EAGER = os.environ.get('JOBS_EAGER', default=False) == 'True'
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 10))
+
+# Кэш токенов (api.authentication): LRU в памяти процесса
+# (TOKEN_CACHE_SIZE токенов, TOKEN_CACHE_TIMEOUT секунд); при общем кэше
+# Django в нём TOKEN_CACHE_SHARED_TIMEOUT секунд живут номера отзыва и
+# id пользователя токена.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 30))
+TOKEN_CACHE_SHARED_TIMEOUT = int(
+    os.getenv('TOKEN_CACHE_SHARED_TIMEOUT', 5 * 60)
+)
+
+# Сколько повторов одного SQL за запрос считать признаком N+1.
+METRICS_DUPLICATE_QUERY_THRESHOLD = int(
+    os.getenv('METRICS_DUPLICATE_QUERY_THRESHOLD', 5)
+)
+
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -0,0 +1,50 @@
+import signal
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import is_shared
+from jobs.queue import prune
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in child processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2,
+                            help='сколько задач выполнять одновременно')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='выйти, когда очередь опустеет',
+        )
+        parser.add_argument(
+            '--keep-days', type=int, default=7,
+            help='сколько дней хранить завершённые задачи',
+        )
+
+    def handle(self, *args, **options):
+        if not is_shared():
+            # Иначе веб-процессы не узнают о результатах задач.
+            raise CommandError(
+                'Воркеру нужен общий кэш: CACHE_BACKEND=redis или file.')
+        pruned = prune(options['keep_days'])
+        if pruned:
+            self.stdout.write(f'Удалено старых задач: {pruned}')
+        worker = Worker(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            log=self.stdout.write,
+        )
+        # docker stop: дочерние процессы останавливаются в Worker.stop().
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+        self.stdout.write(f'Воркер {worker.name} запущен.')
+        started = time.monotonic()
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            f'Воркер остановлен через {time.monotonic() - started:.0f} с.')
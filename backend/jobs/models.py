@@ -0,0 +1,51 @@
+from django.db import models
+from django.utils import timezone
+
+from users.models import CustomUser
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди (см. jobs.queue и run_worker)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField('Тип', max_length=64)
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs',
+    )
+    params = models.JSONField('Параметры', default=dict, blank=True)
+    status = models.CharField(
+        'Статус', max_length=16, choices=STATUSES, default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    started = models.DateTimeField('Начата', null=True, blank=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+    worker = models.CharField('Воркер', max_length=64, blank=True)
+    error = models.TextField('Ошибка', blank=True)
+    result = models.FileField('Результат', upload_to='jobs/', blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_after'],
+                         name='job_status_run_after'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
@@ -0,0 +1,173 @@
+"""Очередь задач в таблице jobs_job, без внешнего брокера.
+
+Задача объявляется декоратором task в модуле tasks.py приложения и
+ставится в очередь функцией enqueue. Выполняет её команда run_worker;
+при JOBS_EAGER задача выполняется сразу в том же процессе.
+
+Функция задачи получает Job и может вернуть (имя файла, байты) —
+это сохраняется в Job.result.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import F, Q
+from django.utils import timezone
+
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+ABANDONED = 'Воркер не завершил задачу.'
+
+
+class Task:
+    def __init__(self, kind, function, timeout, max_attempts):
+        self.kind = kind
+        self.function = function
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+
+
+def lease_expired_before(task, now):
+    """Задача task, начатая раньше этого момента, считается брошенной."""
+    return now - timedelta(seconds=task.timeout + settings.JOBS_RETRY_DELAY)
+
+
+def task(kind, timeout=60, max_attempts=3):
+    """Регистрирует функцию как задачу kind."""
+    def register(function):
+        TASKS[kind] = Task(kind, function, timeout, max_attempts)
+        return function
+    return register
+
+
+def enqueue(kind, user=None, **params):
+    """Новая задача; такая же незавершённая задача не дублируется.
+
+    Брошенная задача (running дольше тайм-аута) сразу проходит через
+    fail, как в recover: её ждали бы до следующего обхода воркера.
+    """
+    if kind not in TASKS:
+        raise KeyError(f'Неизвестная задача: {kind}')
+    job = Job.objects.filter(
+        kind=kind, user=user, params=params,
+        status__in=(Job.QUEUED, Job.RUNNING),
+    ).first()
+    if (job is not None and job.status == Job.RUNNING
+            and job.started < lease_expired_before(
+                TASKS[kind], timezone.now())):
+        job = fail(job.pk, ABANDONED)
+        if job.status == Job.FAILED:
+            job = None
+    if job is None:
+        job = Job.objects.create(kind=kind, user=user, params=params)
+        if settings.JOBS_EAGER:
+            job = run_eagerly(job)
+    return job
+
+
+def claim(worker, limit):
+    """Берёт до limit готовых к запуску задач.
+
+    Задачу забирает тот, чей UPDATE ... WHERE status = 'queued'
+    изменил строку, поэтому несколько воркеров не возьмут одну задачу.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.QUEUED, run_after__lte=now,
+    ).order_by('run_after', 'id').values_list('pk', flat=True)[:limit * 2]
+    claimed = []
+    for pk in candidates:
+        if len(claimed) == limit:
+            break
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started=now, worker=worker,
+            attempts=F('attempts') + 1,
+        ):
+            claimed.append(Job.objects.get(pk=pk))
+    return claimed
+
+
+def perform(job):
+    """Выполняет задачу и сохраняет результат; ошибки не перехватывает."""
+    result = TASKS[job.kind].function(job)
+    if result is not None:
+        name, content = result
+        job.result.save(name, ContentFile(content), save=False)
+    job.status = Job.DONE
+    job.finished = timezone.now()
+    job.error = ''
+    job.save(update_fields=['status', 'finished', 'error', 'result'])
+
+
+def fail(job_id, error):
+    """Повтор с экспоненциальной задержкой или окончательная ошибка."""
+    job = Job.objects.get(pk=job_id)
+    job.error = error
+    task = TASKS.get(job.kind)
+    if task is not None and job.attempts < task.max_attempts:
+        job.status = Job.QUEUED
+        job.run_after = timezone.now() + timedelta(
+            seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1))
+    else:
+        job.status = Job.FAILED
+        job.finished = timezone.now()
+    job.save(update_fields=['status', 'run_after', 'finished', 'error'])
+    logger.warning('%s: попытка %d не удалась', job, job.attempts)
+    return job
+
+
+def run_eagerly(job):
+    """JOBS_EAGER: все попытки сразу, в текущем процессе."""
+    while job.status == Job.QUEUED:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, started=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        job.refresh_from_db()
+        try:
+            perform(job)
+        except Exception:
+            job = fail(job.pk, traceback.format_exc())
+    return job
+
+
+def recover(worker=None, running=()):
+    """Возвращает в очередь задачи воркеров, завершившихся аварийно.
+
+    Брошенной считается задача, которая в статусе running дольше
+    своего тайм-аута, и задача, записанная за worker, но не входящая
+    в running: после перезапуска контейнера у воркера то же имя
+    (хост и pid), а выполнять её уже некому.
+    """
+    now = timezone.now()
+    abandoned = Q()
+    for kind, task in TASKS.items():
+        abandoned |= Q(
+            kind=kind, started__lt=lease_expired_before(task, now))
+    if worker is not None:
+        abandoned |= Q(worker=worker)
+    if not abandoned:
+        return 0
+    stale = Job.objects.filter(abandoned, status=Job.RUNNING).exclude(
+        pk__in=running)
+    recovered = 0
+    for pk in stale.values_list('pk', flat=True):
+        fail(pk, ABANDONED)
+        recovered += 1
+    return recovered
+
+
+def prune(days):
+    """Удаляет завершённые задачи старше days дней вместе с файлами."""
+    old = Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished__lt=timezone.now() - timedelta(days=days),
+    )
+    for job in old.exclude(result=''):
+        job.result.delete(save=False)
+    return old.delete()[0]
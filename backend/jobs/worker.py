@@ -0,0 +1,149 @@
+"""Воркер очереди: каждая задача — в отдельном дочернем процессе.
+
+Отдельный процесс можно остановить по тайм-ауту, а падение задачи
+(в том числе нехватка памяти) не роняет воркер.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from multiprocessing.connection import wait
+
+import django
+from django.apps import apps
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд ждать завершения процесса после SIGTERM.
+TERMINATE_GRACE = 5
+# Как часто искать задачи, брошенные упавшими воркерами.
+RECOVER_INTERVAL = 30
+
+
+def execute(job_id):
+    """Точка входа дочернего процесса."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if not apps.ready:
+        # Метод запуска spawn: Django в новом процессе не настроен.
+        django.setup()
+    from jobs.models import Job
+    from jobs.queue import perform
+
+    job = Job.objects.select_related('user').get(pk=job_id)
+    try:
+        perform(job)
+    except Exception:
+        Job.objects.filter(pk=job_id).update(error=traceback.format_exc())
+        sys.exit(1)
+    finally:
+        connections.close_all()
+
+
+class Worker:
+    def __init__(self, concurrency=2, poll_interval=1.0, log=None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = f'{socket.gethostname()}:{os.getpid()}'[:64]
+        self.log = log or logger.info
+        # job id -> (процесс, срок завершения)
+        self.running = {}
+        self.recovered_at = None
+
+    def start(self, job):
+        from jobs.queue import TASKS
+
+        # Дочерний процесс не должен унаследовать открытые соединения.
+        connections.close_all()
+        process = multiprocessing.Process(
+            target=execute, args=(job.pk,), name=f'job-{job.pk}',
+        )
+        process.start()
+        deadline = time.monotonic() + TASKS[job.kind].timeout
+        self.running[job.pk] = (process, deadline)
+        self.log(f'{job}: запущена, попытка {job.attempts}')
+
+    def reap(self):
+        """Разбирает завершившиеся и просроченные процессы."""
+        from jobs.models import Job
+        from jobs.queue import fail
+
+        for job_id, (process, deadline) in list(self.running.items()):
+            if process.is_alive():
+                if time.monotonic() < deadline:
+                    continue
+                process.terminate()
+                process.join(TERMINATE_GRACE)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+                error = 'Превышено время выполнения.'
+            else:
+                process.join()
+                error = None
+            del self.running[job_id]
+            if error is None and process.exitcode == 0:
+                self.log(f'Задача #{job_id}: готово')
+                continue
+            if error is None:
+                error = (
+                    Job.objects.filter(pk=job_id)
+                    .values_list('error', flat=True).first()
+                    or f'Код завершения {process.exitcode}.'
+                )
+            job = fail(job_id, error)
+            self.log(f'{job}: {error.strip().splitlines()[-1]}')
+
+    def recover(self):
+        """Брошенные задачи — снова в очередь, не чаще RECOVER_INTERVAL."""
+        from jobs.queue import recover
+
+        now = time.monotonic()
+        if (self.recovered_at is not None
+                and now - self.recovered_at < RECOVER_INTERVAL):
+            return
+        self.recovered_at = now
+        recovered = recover(self.name, list(self.running))
+        if recovered:
+            self.log(f'Возвращено в очередь: {recovered}')
+
+    def run(self, once=False):
+        """Цикл воркера; once — выйти, когда очередь опустеет."""
+        from jobs.queue import claim
+
+        try:
+            while True:
+                self.reap()
+                self.recover()
+                free = self.concurrency - len(self.running)
+                claimed = claim(self.name, free) if free else []
+                for job in claimed:
+                    self.start(job)
+                if once and not self.running and not claimed:
+                    return
+                if not claimed:
+                    # Просыпаемся раньше, если какой-то процесс завершился.
+                    wait(
+                        [process.sentinel
+                         for process, _ in self.running.values()],
+                        self.poll_interval,
+                    )
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Останавливает дочерние процессы, их задачи — снова в очередь."""
+        from jobs.queue import fail
+
+        for process, _ in self.running.values():
+            process.terminate()
+        for job_id, (process, _) in self.running.items():
+            process.join(TERMINATE_GRACE)
+            if process.is_alive():
+                process.kill()
+            fail(job_id, 'Воркер остановлен.')
+        self.running.clear()
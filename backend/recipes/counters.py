@@ -0,0 +1,66 @@
+"""Счётчики избранного, корзин, рецептов и подписчиков.
+
+Колонки обновляются атомарно через F() при создании и удалении строк,
+поэтому для показа и сортировки не нужны агрегаты по связанным
+таблицам. Обычный save() записи счётчики не перезаписывает
+(users.models.CountersMixin). Массовые операции сигналов
+не отправляют — после них расхождения исправляет команда
+reconcile_counters.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Favorites, Recipe, ShoppingList
+from users.models import CustomUser, Follow
+
+# (модель со счётчиком, поле счётчика, модель строк, ссылка на владельца)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorites, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingList, 'recipe'),
+    (CustomUser, 'recipes_count', Recipe, 'author'),
+    (CustomUser, 'followers_count', Follow, 'author'),
+)
+
+
+def count_subquery(rows, owner):
+    """Количество строк rows, ссылающихся на текущую запись."""
+    return Coalesce(Subquery(
+        rows.objects.filter(**{owner: OuterRef('pk')})
+        .order_by().values(owner)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile(model, field, rows, owner):
+    """Исправляет расхождения одним UPDATE; возвращает число строк."""
+    actual = count_subquery(rows, owner)
+    return model.objects.exclude(**{field: actual}).update(**{field: actual})
+
+
+def change_counter(model, pk, field, delta):
+    if delta > 0:
+        value = F(field) + delta
+    else:
+        value = Greatest(F(field) + delta, 0)
+    model.objects.filter(pk=pk).update(**{field: value})
+
+
+def connect(model, field, rows, owner):
+    attname = rows._meta.get_field(owner).attname
+
+    @receiver(post_save, sender=rows, weak=False,
+              dispatch_uid=f'counter:{model.__name__}.{field}:save')
+    def row_saved(sender, instance, created, raw=False, **kwargs):
+        if created and not raw:
+            change_counter(model, getattr(instance, attname), field, 1)
+
+    @receiver(post_delete, sender=rows, weak=False,
+              dispatch_uid=f'counter:{model.__name__}.{field}:delete')
+    def row_deleted(sender, instance, **kwargs):
+        change_counter(model, getattr(instance, attname), field, -1)
+
+
+for counter in COUNTERS:
+    connect(*counter)
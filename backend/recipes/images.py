@@ -0,0 +1,67 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+from jobs.queue import enqueue
+
+# Уменьшенные копии: имя -> максимальные ширина и высота.
+RENDITIONS = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+RENDITIONS_DIR = 'renditions'
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def rendition_name(name, rendition):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    extension = EXTENSIONS[settings.IMAGE_RENDITION_FORMAT]
+    return f'{RENDITIONS_DIR}/{stem}_{rendition}.{extension}'
+
+
+def generate_renditions(name):
+    """Создаёт все уменьшенные копии изображения name из хранилища."""
+    image_format = settings.IMAGE_RENDITION_FORMAT
+    with default_storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        original.load()
+    if image_format == 'JPEG' or original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGB')
+    for rendition, size in RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(size)
+        buffer = BytesIO()
+        image.save(buffer, image_format, quality=80)
+        target = rendition_name(name, rendition)
+        default_storage.delete(target)
+        default_storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def schedule_renditions(name):
+    """Ставит создание копий в очередь после коммита транзакции."""
+    transaction.on_commit(lambda: enqueue('image_renditions', name=name))
+
+
+def delete_renditions(name):
+    for rendition in RENDITIONS:
+        default_storage.delete(rendition_name(name, rendition))
+
+
+def rendition_urls(image, ready):
+    """Ссылки на копии без обращения к хранилищу.
+
+    ready — Recipe.renditions_ready; пока копии не готовы, все ссылки
+    ведут на оригинал.
+    """
+    if not ready:
+        return {rendition: image.url for rendition in RENDITIONS}
+    return {
+        rendition: default_storage.url(rendition_name(image.name, rendition))
+        for rendition in RENDITIONS
+    }
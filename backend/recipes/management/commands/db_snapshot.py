@@ -0,0 +1,139 @@
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes.models import Recipe
+from recipes.signals import recipes_loaded
+
+ACTIONS = ('save', 'restore', 'list', 'delete')
+
+
+class Command(BaseCommand):
+    help = 'Save and restore whole-database snapshots for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=ACTIONS)
+        parser.add_argument('name', nargs='?', default='default')
+        parser.add_argument(
+            '--dir', default=str(Path(settings.BASE_DIR) / 'snapshots'),
+            help='каталог снимков SQLite',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'postgresql':
+            storage = PostgresSnapshots(connection)
+        elif connection.vendor == 'sqlite':
+            storage = SqliteSnapshots(connection, Path(options['dir']))
+        else:
+            raise CommandError(f'{connection.vendor} не поддерживается.')
+        action, name = options['action'], options['name']
+        if action == 'list':
+            for snapshot in storage.list():
+                self.stdout.write(snapshot)
+            return
+        if action != 'save' and name not in storage.list():
+            raise CommandError(f'Снимка {name} нет.')
+        started = time.monotonic()
+        getattr(storage, action)(name)
+        if action == 'restore':
+            # Кэш и индекс «что приготовить» описывают прежние данные.
+            cache.clear()
+            recipes_loaded.send(sender=Recipe)
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {name}: {time.monotonic() - started:.1f} с.'))
+
+
+class SqliteSnapshots:
+    """Копии файла базы через backup API: согласованы и без остановки."""
+    suffix = '.sqlite3'
+
+    def __init__(self, connection, directory):
+        self.connection = connection
+        self.directory = directory
+
+    def path(self, name):
+        return self.directory / f'{name}{self.suffix}'
+
+    def list(self):
+        if not self.directory.is_dir():
+            return []
+        return sorted(path.stem for path in self.directory.glob(
+            f'*{self.suffix}'))
+
+    def save(self, name):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.connection.ensure_connection()
+        with closing(sqlite3.connect(self.path(name))) as target:
+            self.connection.connection.backup(target)
+
+    def restore(self, name):
+        self.connection.ensure_connection()
+        with closing(sqlite3.connect(self.path(name))) as source:
+            source.backup(self.connection.connection)
+
+    def delete(self, name):
+        self.path(name).unlink()
+
+
+class PostgresSnapshots:
+    """Снимки — базы-шаблоны рядом с основной.
+
+    CREATE DATABASE ... TEMPLATE копирует файлы базы целиком, без
+    повторной вставки строк. Шаблон не должен иметь подключений,
+    поэтому чужие сеансы к копируемой базе завершаются.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.database = connection.settings_dict['NAME']
+        self.prefix = f'{self.database}__snapshot__'
+
+    def execute(self, *statements):
+        self.connection.close()
+        with self.connection._nodb_cursor() as cursor:
+            for sql, params in statements:
+                cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+
+    def terminate(self, database):
+        return (
+            'SELECT pg_terminate_backend(pid) FROM pg_stat_activity '
+            'WHERE datname = %s AND pid <> pg_backend_pid()',
+            [database],
+        )
+
+    def quoted(self, name):
+        return self.connection.ops.quote_name(f'{self.prefix}{name}')
+
+    def list(self):
+        rows = self.execute((
+            'SELECT datname FROM pg_database WHERE starts_with(datname, %s) '
+            'ORDER BY datname',
+            [self.prefix],
+        ))
+        return [row[0][len(self.prefix):] for row in rows]
+
+    def save(self, name):
+        database = self.connection.ops.quote_name(self.database)
+        self.execute(
+            (f'DROP DATABASE IF EXISTS {self.quoted(name)}', None),
+            self.terminate(self.database),
+            (f'CREATE DATABASE {self.quoted(name)} TEMPLATE {database}',
+             None),
+        )
+
+    def restore(self, name):
+        database = self.connection.ops.quote_name(self.database)
+        self.execute(
+            (f'DROP DATABASE {database} WITH (FORCE)', None),
+            (f'CREATE DATABASE {database} TEMPLATE {self.quoted(name)}',
+             None),
+        )
+
+    def delete(self, name):
+        self.execute((f'DROP DATABASE {self.quoted(name)}', None))
@@ -1,35 +1,174 @@
 import csv
+import io
 import json
+import os
+import re
+import time
+from itertools import chain, islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
-from django.core.management.base import BaseCommand
 from recipes.models import Ingredient
+from recipes.signals import ingredients_loaded
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'data')
+SKIP = re.compile(r'[\s,]*')
+
+
+def read_csv(path):
+    """Строки CSV по одной; заголовок name,measurement_unit пропускается."""
+    with open(path, 'r', encoding='utf-8', newline='') as csvfile:
+        for row in csv.reader(csvfile):
+            if row == ['name', 'measurement_unit']:
+                continue
+            if len(row) == 2:
+                yield row
+
+
+def iter_json_array(file, chunk_size=1 << 16):
+    """Элементы JSON-массива по одному, без загрузки файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError(f'{file.name}: ожидается JSON-массив.')
+    pos = 1
+    while True:
+        pos = SKIP.match(buffer, pos).end()
+        if buffer.startswith(']', pos):
+            return
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise CommandError(f'{file.name}: файл оборван.')
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as jsonfile:
+        for item in iter_json_array(jsonfile):
+            yield item['name'], item['measurement_unit']
+
+
+def clean(rows):
+    for name, measurement_unit in rows:
+        name, measurement_unit = name.strip(), measurement_unit.strip()
+        if name and measurement_unit:
+            yield name, measurement_unit
+
+
+def batches(rows, size):
+    """Пачки уникальных пар (name, measurement_unit)."""
+    rows = iter(rows)
+    while True:
+        batch = list(dict.fromkeys(islice(rows, size)))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_load(rows, batch_size):
+    for batch in batches(rows, batch_size):
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in batch
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+
+
+def copy_load(rows, batch_size):
+    """Загрузка через COPY во временную таблицу (PostgreSQL)."""
+    table = connection.ops.quote_name(Ingredient._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMP TABLE ingredient_load '
+            '(name text, measurement_unit text) ON COMMIT DROP'
+        )
+        for batch in batches(rows, batch_size):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(
+                'COPY ingredient_load FROM STDIN WITH (FORMAT csv)', buffer
+            )
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            'SELECT DISTINCT name, measurement_unit FROM ingredient_load '
+            'ON CONFLICT DO NOTHING'
+        )
 
 
 class Command(BaseCommand):
     help = 'Load ingredients data from CSV and JSON files'
 
-    def handle(self, *args, **kwargs):
-        # Load data from CSV
-        with open('data/ingredients.csv', 'r', encoding='utf-8') as csvfile:
-            csv_data = csv.reader(csvfile)
-            next(csv_data)
-            for row in csv_data:
-                name, measurement_unit = row
-                Ingredient.objects.create(
-                    name=name,
-                    measurement_unit=measurement_unit
-                )
-
-        # Load data from JSON
-        with open('data/ingredients.json', 'r', encoding='utf-8') as jsonfile:
-            json_data = json.load(jsonfile)
-            for item in json_data:
-                name = item['name']
-                measurement_unit = item['measurement_unit']
-                Ingredient.objects.create(
-                    name=name,
-                    measurement_unit=measurement_unit
-                )
-
-        self.stdout.write(
-            self.style.SUCCESS('Successfully loaded ingredients'))
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--csv', default=os.path.join(DATA_DIR, 'ingredients.csv'),
+            help='CSV file: name,measurement_unit per line.'
+        )
+        parser.add_argument(
+            '--json', default=os.path.join(DATA_DIR, 'ingredients.json'),
+            help='JSON array of {"name", "measurement_unit"} objects.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows per INSERT or COPY batch.'
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Use bulk_create even on PostgreSQL.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Read and validate the files without writing.'
+        )
+
+    def handle(self, *args, **options):
+        sources = []
+        for key, reader in (('csv', read_csv), ('json', read_json)):
+            path = options[key]
+            if path:
+                if not os.path.exists(path):
+                    raise CommandError(f'File not found: {path}')
+                sources.append(reader(path))
+
+        read = 0
+
+        def counted(rows):
+            nonlocal read
+            for row in rows:
+                read += 1
+                yield row
+
+        rows = counted(clean(chain(*sources)))
+        started = time.monotonic()
+        if options['dry_run']:
+            for _ in batches(rows, options['batch_size']):
+                pass
+            added = 0
+        else:
+            before = Ingredient.objects.count()
+            with transaction.atomic():
+                if (connection.vendor == 'postgresql'
+                        and not options['no_copy']):
+                    copy_load(rows, options['batch_size'])
+                else:
+                    bulk_load(rows, options['batch_size'])
+            added = Ingredient.objects.count() - before
+            ingredients_loaded.send(sender=Ingredient)
+        elapsed = max(time.monotonic() - started, 1e-6)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {read} rows, added {added} ingredients '
+            f'in {elapsed:.2f}s ({read / elapsed:.0f} rows/s)'
+            + (' [dry run]' if options['dry_run'] else '')
+        ))
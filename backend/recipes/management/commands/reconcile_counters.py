@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount favorites, cart, recipe and follower counters'
+
+    def handle(self, *args, **kwargs):
+        for model, field, rows, owner in COUNTERS:
+            with transaction.atomic():
+                fixed = reconcile(model, field, rows, owner)
+            self.stdout.write(
+                f'{model.__name__}.{field}: исправлено {fixed}')
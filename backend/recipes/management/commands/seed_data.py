@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.seeding import Seeder, flush, synthetic_users
+
+
+class Command(BaseCommand):
+    help = 'Seed a deterministic synthetic dataset for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes-per-author', type=int, default=5)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='подписок у каждого пользователя')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='рецептов в избранном у каждого')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='средний размер списка покупок')
+        parser.add_argument(
+            '--author-skew', type=float, default=0,
+            help='показатель Ципфа для популярности авторов и рецептов; '
+                 '0 — равномерно, 1 — типичный «длинный хвост»',
+        )
+        parser.add_argument(
+            '--cart-tail', type=float, default=0,
+            help='показатель Парето для размера списка покупок (> 1); '
+                 '0 — у всех одинаковый',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='в PostgreSQL писать через INSERT, а не COPY',
+        )
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='сначала удалить ранее созданные синтетические данные',
+        )
+
+    def handle(self, *args, **options):
+        exists = synthetic_users().exists()
+        if exists and not options['flush']:
+            raise CommandError(
+                'Синтетические данные уже есть; используйте --flush.')
+        started = time.monotonic()
+        seeder = Seeder(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            use_copy=not options['no_copy'],
+            log=self.stdout.write,
+        )
+        with transaction.atomic():
+            if exists:
+                self.stdout.write(f'Удалено строк: {flush()}')
+            seeder.run(
+                users=options['users'],
+                recipes_per_author=options['recipes_per_author'],
+                ingredients_per_recipe=options['ingredients_per_recipe'],
+                follows=options['follows'],
+                favorites=options['favorites'],
+                cart=options['cart'],
+                author_skew=options['author_skew'],
+                cart_tail=options['cart_tail'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с.'))
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.5 on 2026-10-18 06:13
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Схлопывает дубли ингредиентов, оставшиеся от повторной загрузки."""
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = (
+        Ingredient.objects.values('name', 'measurement_unit')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for group in duplicates:
+        keep_id = group['keep_id']
+        duplicate_ids = list(
+            Ingredient.objects.filter(
+                name=group['name'],
+                measurement_unit=group['measurement_unit'],
+            ).exclude(id=keep_id).values_list('id', flat=True)
+        )
+        for used in RecipeIngredient.objects.filter(
+            ingredient_id__in=duplicate_ids
+        ):
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=used.recipe_id, ingredient_id=keep_id
+            ).first()
+            if kept:
+                kept.amount += used.amount
+                kept.save(update_fields=['amount'])
+                used.delete()
+            else:
+                used.ingredient_id = keep_id
+                used.save(update_fields=['ingredient'])
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
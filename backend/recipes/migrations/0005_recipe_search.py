@@ -0,0 +1,52 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian'::regconfig,
+                              coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('russian'::regconfig,
+                              coalesce(text, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX recipe_search_vector ON recipes_recipe '
+    'USING GIN (search_vector)',
+]
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS recipe_search_vector',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+]
+SQLITE_FORWARD = [
+    'CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5'
+    "(name, text, tokenize = 'unicode61 remove_diacritics 2')",
+    'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+    'SELECT id, name, text FROM recipes_recipe',
+]
+SQLITE_BACKWARD = [
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, ()):
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRES_FORWARD,
+                 'sqlite': SQLITE_FORWARD}),
+            run({'postgresql': POSTGRES_BACKWARD,
+                 'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
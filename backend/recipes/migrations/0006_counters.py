@@ -0,0 +1,48 @@
+# Generated by Django 4.2.5 on 2026-10-18 06:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes.Recipe', 'favorites_count', 'recipes.Favorites', 'recipe'),
+    ('recipes.Recipe', 'in_carts_count', 'recipes.ShoppingList', 'recipe'),
+    ('users.CustomUser', 'recipes_count', 'recipes.Recipe', 'author'),
+    ('users.CustomUser', 'followers_count', 'users.Follow', 'author'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    """Начальные значения счётчиков по существующим строкам."""
+    db_alias = schema_editor.connection.alias
+    for model_name, field, rows_name, owner in COUNTERS:
+        rows = apps.get_model(rows_name)
+        apps.get_model(model_name).objects.using(db_alias).update(**{
+            field: Coalesce(Subquery(
+                rows.objects.filter(**{owner: OuterRef('pk')})
+                .order_by().values(owner)
+                .annotate(total=Count('pk')).values('total')
+            ), 0)
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_search'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.5 on 2026-10-18 07:01
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+from recipes.images import RENDITIONS, rendition_name
+
+
+def mark_existing(apps, schema_editor):
+    """Копии, созданные до появления поля, уже лежат в хранилище."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ready = [
+        pk for pk, name in Recipe.objects.exclude(image='').exclude(
+            image=None).values_list('pk', 'image').iterator()
+        if all(default_storage.exists(rendition_name(name, rendition))
+               for rendition in RENDITIONS)
+    ]
+    Recipe.objects.filter(pk__in=ready).update(renditions_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Копии изображения готовы'),
+        ),
+        migrations.RunPython(mark_existing, migrations.RunPython.noop),
+    ]
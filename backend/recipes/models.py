@@ -3,7 +3,7 @@ from django.db.models.constraints import UniqueConstraint
 from django.core.validators import MinLengthValidator
 from django.core.validators import MinValueValidator
 
-from users.models import CustomUser
+from users.models import CountersMixin, CustomUser
 
 
 class Tags(models.Model):
@@ -42,11 +42,17 @@ class Ingredient(models.Model):
         verbose_name='Единицы измерения',
     )
 
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['name', 'measurement_unit'],
+                             name='unique_ingredient')
+        ]
+
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
     """ Модель рецепта."""
     author = models.ForeignKey(
         CustomUser,
@@ -78,10 +84,32 @@ class Recipe(models.Model):
         verbose_name='Время приготовления',
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном',
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок',
+    )
+    renditions_ready = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Копии изображения готовы',
+    )
+    counter_fields = ('favorites_count', 'in_carts_count')
 
     class Meta:
         default_related_name = 'recipes'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_id'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date'),
+        ]
 
     def get_ingredients(self):
         return self.ingredients.through.objects.filter(recipe=self)
@@ -139,6 +167,10 @@ class ShoppingList(models.Model):
                 name='unique_shopping_list'
             )
         ]
+        indexes = [
+            models.Index(fields=['recipe', 'user'],
+                         name='shopping_recipe_user'),
+        ]
 
     def __str__(self):
         return f'{self.user} {self.recipe}'
@@ -168,6 +200,10 @@ class Favorites(models.Model):
                 name='unique_favorite'
             )
         ]
+        indexes = [
+            models.Index(fields=['recipe', 'user'],
+                         name='favorite_recipe_user'),
+        ]
 
     def __str__(self):
         return f'{self.user} {self.recipe}'
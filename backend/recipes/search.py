@@ -0,0 +1,79 @@
+"""Полнотекстовый поиск рецептов по названию и тексту.
+
+В PostgreSQL это хранимая колонка search_vector (to_tsvector с русской
+конфигурацией) с GIN-индексом; колонку пересчитывает сама база.
+В SQLite для локального запуска используется таблица FTS5, которую
+обновляют сигналы сохранения и удаления рецепта.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+WORD = re.compile(r'\w+')
+
+
+def fts_query(query):
+    """Запрос FTS5: все слова обязательны, каждое ищется как префикс."""
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query))
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под запрос, от самых релевантных."""
+    quote = connection.ops.quote_name
+    table = quote(queryset.model._meta.db_table)
+    if connection.vendor == 'postgresql':
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        match = f'{table}.search_vector @@ {tsquery}'
+        rank = f'ts_rank({table}.search_vector, {tsquery})'
+    else:
+        query = fts_query(query)
+        if not query:
+            return queryset.none()
+        fts = quote(FTS_TABLE)
+        match = (f'{table}.id IN (SELECT rowid FROM {fts} '
+                 f'WHERE {fts} MATCH %s)')
+        rank = (f'(SELECT -bm25({fts}, 10.0, 1.0) FROM {fts} '
+                f'WHERE {fts} MATCH %s AND rowid = {table}.id)')
+    return queryset.filter(
+        RawSQL(match, (query,), output_field=BooleanField())
+    ).annotate(
+        search_rank=RawSQL(rank, (query,), output_field=FloatField())
+    ).order_by('-search_rank', '-pub_date', '-id')
+
+
+def index_recipe(recipe):
+    """Обновляет запись рецепта в FTS5; в PostgreSQL ничего не делает."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            f'VALUES (%s, %s, %s)',
+            [recipe.pk, recipe.name, recipe.text],
+        )
+
+
+def unindex_recipe(recipe_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id])
+
+
+def rebuild_search_index():
+    """Заполняет FTS5 заново, например после bulk_create рецептов."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            f'SELECT id, name, text FROM recipes_recipe'
+        )
@@ -0,0 +1,346 @@
+"""Детерминированный синтетический набор данных для замеров.
+
+Строки пишутся пачками: bulk_create или, в PostgreSQL, COPY. Сигналы
+моделей при этом не отправляются, поэтому после заполнения
+пересчитываются счётчики и поисковый индекс, а подписчики
+recipes_loaded сбрасывают кэши.
+
+Популярность авторов и рецептов распределена по Ципфу (author_skew),
+размер списка покупок — с тяжёлым хвостом Парето (cart_tail).
+"""
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.counters import COUNTERS, reconcile
+from recipes.models import Favorites, Ingredient, Recipe, RecipeIngredient
+from recipes.models import ShoppingList, Tags
+from recipes.search import rebuild_search_index
+from recipes.signals import recipes_loaded
+from users.models import CustomUser, Follow
+
+# По этому домену синтетических пользователей можно найти и удалить.
+EMAIL_DOMAIN = 'seed.local'
+PASSWORD = 'seed-password'
+TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+)
+# Во сколько раз корзина может превышать средний размер.
+CART_CAP = 50
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r',
+})
+
+
+@contextmanager
+def explicit_pub_date():
+    """Разрешает задать pub_date вручную (auto_now_add его перезаписал бы)."""
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def synthetic_users():
+    return CustomUser.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}')
+
+
+def raw_delete(queryset):
+    """DELETE одним запросом, без каскада и сигналов ORM."""
+    return queryset._raw_delete(queryset.db)
+
+
+def flush():
+    """Удаляет синтетических пользователей и всё, что на них ссылается.
+
+    Каскад ORM отправил бы post_delete (счётчики, индексы, кэши) для
+    каждой подписки, избранного, корзины и рецепта, поэтому строки
+    удаляются запросами по таблицам, сначала дочерние. Счётчики, поиск
+    и кэши после этого пересчитывает Seeder.finish(). Возвращает
+    число удалённых строк.
+    """
+    users = synthetic_users()
+    recipes = Recipe.objects.filter(author__in=users.values('pk'))
+    # Через ORM: сигналы сбрасывают кэш токенов и версии корзин
+    # настоящих пользователей, а строк здесь немного.
+    deleted, _ = Token.objects.filter(user__in=users.values('pk')).delete()
+    deleted += ShoppingList.objects.filter(
+        recipe__in=recipes.values('pk')
+    ).exclude(user__in=users.values('pk')).delete()[0]
+    for model, queryset in ((Recipe, recipes), (CustomUser, users)):
+        pks = queryset.values('pk')
+        for field in model._meta.many_to_many:
+            deleted += raw_delete(field.remote_field.through.objects.filter(
+                **{f'{field.m2m_field_name()}__in': pks}))
+        for relation in model._meta.related_objects:
+            if not relation.many_to_many:
+                deleted += raw_delete(relation.related_model.objects.filter(
+                    **{f'{relation.field.name}__in': pks}))
+        deleted += raw_delete(queryset)
+    return deleted
+
+
+def copy_value(value):
+    """Значение в текстовом формате COPY."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).translate(COPY_ESCAPES)
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса 1 / rank ** skew; при skew = 0 все равны."""
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+def split_total(total, cum_weights):
+    """Раскладывает total по весам методом наибольшего остатка."""
+    weights = [
+        current - previous
+        for previous, current in zip([0] + cum_weights, cum_weights)
+    ]
+    scale = total / cum_weights[-1]
+    shares = [weight * scale for weight in weights]
+    counts = [int(share) for share in shares]
+    leftover = total - sum(counts)
+    by_remainder = sorted(
+        range(len(shares)), key=lambda index: counts[index] - shares[index]
+    )
+    for index in by_remainder[:leftover]:
+        counts[index] += 1
+    return counts
+
+
+class Seeder:
+    def __init__(self, seed=0, batch_size=5000, use_copy=True, log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.use_copy = use_copy and connection.vendor == 'postgresql'
+        self.log = log or (lambda message: None)
+
+    def insert(self, model, objects, **kwargs):
+        """Запись пачками; objects может быть генератором.
+
+        COPY не умеет ignore_conflicts, с такими параметрами всегда
+        используется bulk_create.
+        """
+        objects = iter(objects)
+        total = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            if self.use_copy and not kwargs:
+                self.copy(model, batch)
+            else:
+                model.objects.bulk_create(batch, **kwargs)
+            total += len(batch)
+        self.log(f'{model._meta.label}: {total}')
+        return total
+
+    def copy(self, model, objects):
+        """COPY ... FROM STDIN; значения готовятся, как в bulk_create."""
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        buffer = io.StringIO()
+        for obj in objects:
+            buffer.write('\t'.join(
+                copy_value(field.get_db_prep_save(
+                    field.pre_save(obj, True), connection))
+                for field in fields
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN',
+                buffer,
+            )
+
+    def weighted_unique(self, population, cum_weights, count, exclude=None):
+        """count разных элементов population с учётом весов, кроме exclude.
+
+        Если нужна больше чем половина population, веса уже мало что
+        меняют, и выборка делается равномерно.
+        """
+        rng = self.rng
+        limit = len(population) - (exclude is not None)
+        count = min(count, limit)
+        if count > limit // 2:
+            candidates = [item for item in population if item != exclude]
+            return sorted(rng.sample(
+                candidates, min(count, len(candidates))))
+        chosen = set()
+        while len(chosen) < count:
+            chosen.update(rng.choices(
+                population, cum_weights=cum_weights, k=count - len(chosen)))
+            chosen.discard(exclude)
+        return sorted(chosen)
+
+    def users(self, count):
+        password = make_password(PASSWORD, salt='seed')
+        joined = timezone.now()
+        self.insert(CustomUser, (
+            CustomUser(
+                email=f'user{number}@{EMAIL_DOMAIN}',
+                username=f'user{number}',
+                first_name='Пользователь',
+                last_name=str(number),
+                password=password,
+                date_joined=joined,
+            )
+            for number in range(count)
+        ))
+        return list(
+            synthetic_users().order_by('pk').values_list('pk', flat=True)
+        )
+
+    def ingredients(self, count):
+        """Не меньше count ингредиентов; недостающие создаются."""
+        missing = count - Ingredient.objects.count()
+        if missing > 0:
+            self.insert(Ingredient, (
+                Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+                for number in range(missing)
+            ), ignore_conflicts=True)
+        return list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+
+    def tags(self):
+        if not Tags.objects.exists():
+            self.insert(Tags, (
+                Tags(name=name, slug=slug, color=color)
+                for name, slug, color in TAGS
+            ))
+        return list(Tags.objects.order_by('pk').values_list('pk', flat=True))
+
+    def recipes(self, author_ids, cum_weights, per_author):
+        """В среднем per_author рецептов; популярным авторам — больше."""
+        rng = self.rng
+        now = timezone.now()
+        counts = split_total(per_author * len(author_ids), cum_weights)
+        recipes = (
+            Recipe(
+                author_id=author_id,
+                name=f'Рецепт {author_id}-{number}',
+                text=f'Синтетический рецепт номер {number}.',
+                cooking_time=rng.randint(5, 180),
+                pub_date=now - timedelta(minutes=rng.randint(0, 525600)),
+            )
+            for author_id, count in zip(author_ids, counts)
+            for number in range(count)
+        )
+        first = Recipe.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        with explicit_pub_date():
+            self.insert(Recipe, recipes)
+        return list(
+            Recipe.objects.filter(pk__gt=first, author_id__in=author_ids)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def recipe_ingredients(self, recipe_ids, ingredient_ids, per_recipe):
+        rng = self.rng
+        per_recipe = min(per_recipe, len(ingredient_ids))
+        self.insert(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(ingredient_ids, per_recipe)
+        ))
+
+    def recipe_tags(self, recipe_ids, tag_ids):
+        rng = self.rng
+        through = Recipe.tags.through
+        self.insert(through, (
+            through(recipe_id=recipe_id, tags_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(
+                tag_ids, rng.randint(1, len(tag_ids)))
+        ))
+
+    def follows(self, user_ids, author_ids, cum_weights, per_user):
+        """Подписки без повторов и без подписки на себя."""
+        self.insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in self.weighted_unique(
+                author_ids, cum_weights, per_user, exclude=user_id)
+        ))
+
+    def user_recipes(self, model, user_ids, recipe_ids, cum_weights, sizes):
+        """Избранное или список покупок: sizes[i] разных рецептов."""
+        self.insert(model, (
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id, size in zip(user_ids, sizes)
+            for recipe_id in self.weighted_unique(
+                recipe_ids, cum_weights, size)
+        ))
+
+    def cart_sizes(self, count, mean, tail):
+        """Размеры корзин: Парето с показателем tail и средним mean.
+
+        При tail <= 1 среднее бесконечно, такие значения означают
+        одинаковые корзины.
+        """
+        if tail <= 1:
+            return [mean] * count
+        scale = mean * (tail - 1) / tail
+        return [
+            min(mean * CART_CAP, int(scale * self.rng.paretovariate(tail)))
+            for _ in range(count)
+        ]
+
+    def run(self, users, recipes_per_author, ingredients_per_recipe,
+            follows, favorites, cart, author_skew=0, cart_tail=0):
+        rng = self.rng
+        user_ids = self.users(users)
+        ingredient_ids = self.ingredients(ingredients_per_recipe * 10)
+        tag_ids = self.tags()
+        # Ранг популярности не должен совпадать с порядком id.
+        author_ids = user_ids[:]
+        rng.shuffle(author_ids)
+        author_weights = zipf_weights(len(author_ids), author_skew)
+        recipe_ids = self.recipes(
+            author_ids, author_weights, recipes_per_author)
+        self.recipe_ingredients(
+            recipe_ids, ingredient_ids, ingredients_per_recipe)
+        self.recipe_tags(recipe_ids, tag_ids)
+        self.follows(user_ids, author_ids, author_weights, follows)
+        rng.shuffle(recipe_ids)
+        recipe_weights = zipf_weights(len(recipe_ids), author_skew)
+        self.user_recipes(
+            Favorites, user_ids, recipe_ids, recipe_weights,
+            [favorites] * len(user_ids),
+        )
+        self.user_recipes(
+            ShoppingList, user_ids, recipe_ids, recipe_weights,
+            self.cart_sizes(len(user_ids), cart, cart_tail),
+        )
+        self.finish()
+
+    def finish(self):
+        for counter in COUNTERS:
+            reconcile(*counter)
+        rebuild_search_index()
+        transaction.on_commit(lambda: recipes_loaded.send(sender=Recipe))
@@ -0,0 +1,20 @@
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient
+
+
+def get_shopping_list(user):
+    """Ингредиенты из списка покупок пользователя.
+
+    Суммирует количество одним GROUP BY запросом по
+    ShoppingList -> RecipeIngredient -> Ingredient и возвращает
+    кортежи (ингредиент, единица измерения, итого),
+    отсортированные по названию и единице измерения.
+    """
+    return (
+        RecipeIngredient.objects
+        .filter(recipe__is_in_shopping_cart__user=user)
+        .values_list('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(total=Sum('amount'))
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+    )
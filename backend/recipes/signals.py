@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+# Справочник ингредиентов загружен массово, минуя save().
+ingredients_loaded = Signal()
+
+# Готовы уменьшенные копии изображения рецепта.
+renditions_ready = Signal()
+
+# Рецепты и связанные строки загружены массово, минуя save().
+recipes_loaded = Signal()
@@ -0,0 +1,14 @@
+from jobs.queue import task
+from recipes.images import generate_renditions
+from recipes.models import Recipe
+from recipes.signals import renditions_ready
+
+
+@task('image_renditions', timeout=120)
+def image_renditions(job):
+    """Уменьшенные копии загруженного изображения рецепта."""
+    name = job.params['name']
+    generate_renditions(name)
+    # Картинку могли заменить, пока шла задача: тогда имя другое.
+    Recipe.objects.filter(image=name).update(renditions_ready=True)
+    renditions_ready.send(sender=None, name=name)
@@ -0,0 +1,8 @@
+"""URL-схема ASGI для тестов: api/ с асинхронными обработчиками."""
+from django.urls import include, path
+
+from api.urls import async_urlpatterns, urlpatterns as api_urlpatterns
+
+urlpatterns = [
+    path('api/', include(async_urlpatterns() + api_urlpatterns)),
+]
@@ -0,0 +1,7 @@
+from api.replicas import ReplicaRouter
+
+
+class TestReplicaRouter(ReplicaRouter):
+    """Схему тестовой реплики создаёт migrate: репликации в тестах нет."""
+    def allow_migrate(self, db, app_label, **hints):
+        return True
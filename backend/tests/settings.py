@@ -0,0 +1,40 @@
+"""Настройки тестов: python manage.py test --settings=tests.settings
+
+По умолчанию база — SQLite; TEST_POSTGRES=True оставляет PostgreSQL
+из foodgram.settings (так тесты идут в CI). Вторая база SQLite
+replica нужна тестам api.replicas: чтение в неё включается
+через override_settings(REPLICA_DATABASES=['replica']), а схему в ней
+создаёт migrate (tests.routers).
+"""
+import os
+import tempfile
+
+from foodgram.settings import *  # noqa: F401,F403
+from foodgram.settings import BASE_DIR, DATABASES
+
+if os.environ.get('TEST_POSTGRES', default=False) != 'True':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'test.sqlite3'),
+        }
+    }
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'test_replica.sqlite3'),
+}
+REPLICA_DATABASES = []
+DATABASE_ROUTERS = ['tests.routers.TestReplicaRouter']
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-test-media-')
+JOBS_EAGER = False
+# Повторы задач в тестах ожидаемы, их предупреждения только мешают.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'loggers': {'jobs': {'level': 'ERROR'}},
+}
@@ -0,0 +1,92 @@
+"""Асинхронные обработчики (api.async_views) отвечают как ViewSet'ы."""
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from recipes.models import Ingredient, Recipe, Tags
+from recipes.seeding import synthetic_users
+from tests.utils import seed_catalogue
+
+ASYNC_URLCONF = 'tests.async_urls'
+HEADERS = ('Content-Type', 'Allow', 'Vary', 'WWW-Authenticate', 'X-Cache',
+           'ETag')
+# Снимки в памяти: асинхронный обработчик ничего бы не дал.
+SYNC_PATHS = ('/api/tags/', '/api/ingredients/')
+
+
+@async_to_sync
+async def fetch(url, headers=None):
+    """GET через ASGI-обработчик и схему URL с асинхронными маршрутами."""
+    with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+        return await AsyncClient().get(url, headers=headers)
+
+
+class AsyncViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue()
+        cls.user = synthetic_users().order_by('pk').first()
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        token_cache.entries.clear()
+
+    def cases(self):
+        auth = {'Authorization': f'Token {self.token.key}'}
+        recipe = Recipe.objects.order_by('pk').first()
+        tag = Tags.objects.order_by('pk').first()
+        ingredient = Ingredient.objects.order_by('pk').first()
+        return [
+            ('/api/recipes/', {}),
+            ('/api/recipes/', auth),
+            ('/api/recipes/?limit=2&page=2', auth),
+            (f'/api/recipes/?tags={tag.slug}', auth),
+            ('/api/recipes/?tags=unknown', auth),
+            ('/api/recipes/?page=999', {}),
+            (f'/api/recipes/{recipe.pk}/', {}),
+            (f'/api/recipes/{recipe.pk}/', auth),
+            ('/api/recipes/0/', auth),
+            ('/api/recipes/', {'Authorization': 'Token wrong'}),
+            ('/api/recipes/', {'Authorization': 'Token'}),
+            ('/api/tags/', {}),
+            (f'/api/tags/{tag.pk}/', {}),
+            ('/api/ingredients/', {}),
+            (f'/api/ingredients/?name={ingredient.name[:3]}', {}),
+            (f'/api/ingredients/{ingredient.pk}/', {}),
+            ('/api/users/subscriptions/?recipes_limit=1', auth),
+            ('/api/users/subscriptions/?limit=1&page=2', auth),
+            ('/api/users/subscriptions/', {}),
+        ]
+
+    def test_routes_are_async(self):
+        for url, _ in self.cases():
+            path = url.split('?')[0]
+            with self.subTest(url=url):
+                self.assertEqual(
+                    asyncio.iscoroutinefunction(
+                        resolve(path, ASYNC_URLCONF).func),
+                    path not in SYNC_PATHS,
+                )
+
+    def test_same_response_as_sync(self):
+        for url, headers in self.cases():
+            with self.subTest(url=url, headers=headers):
+                cache.clear()
+                expected = self.client.get(url, headers=headers)
+                cache.clear()
+                actual = fetch(url, headers)
+                self.assertEqual(actual.status_code, expected.status_code)
+                self.assertEqual(actual.content, expected.content)
+                for header in HEADERS:
+                    self.assertEqual(
+                        actual.get(header), expected.get(header), header)
+
+    def test_guest_cache_is_shared_with_sync(self):
+        self.client.get('/api/recipes/')
+        response = fetch('/api/recipes/')
+        self.assertEqual(response['X-Cache'], 'HIT')
@@ -0,0 +1,116 @@
+"""Кэш токенов (api.authentication) и его сброс."""
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication, TokenCache
+from api.authentication import shared_key
+from api.authentication import token_cache
+from users.models import CustomUser
+
+
+def shared_cache():
+    location = tempfile.mkdtemp(prefix='foodgram-test-cache-')
+    return location, override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': location,
+    }})
+
+
+class TokenCacheMixin:
+    def setUp(self):
+        cache.clear()
+        token_cache.entries.clear()
+        self.user = CustomUser.objects.create_user(
+            username='cook', email='cook@example.com', password='secret')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.auth.authenticate_credentials(self.token.key)[0]
+
+    def test_second_lookup_skips_database(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().pk, self.user.pk)
+
+    def test_password_change_drops_token(self):
+        self.authenticate()
+        self.user.set_password('other')
+        self.user.save(update_fields=['password'])
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_deactivation_rejects_token(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_delete_token_rejects_token(self):
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_unrelated_save_keeps_token(self):
+        self.authenticate()
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_token_read_before_revocation_is_not_cached(self):
+        revision = token_cache.get(self.token.key).revision
+        stale = Token.objects.select_related('user').get(pk=self.token.pk)
+        token_cache.forget(self.token.key)
+        token_cache.set(stale, revision)
+        self.assertIsNone(token_cache.get(self.token.key).token)
+
+
+class LocalTokenCacheTest(TokenCacheMixin, TestCase):
+    """locmem: токены в памяти процесса."""
+
+
+class SharedTokenCacheTest(TokenCacheMixin, TestCase):
+    """Общий кэш: отзыв виден всем процессам."""
+
+    def setUp(self):
+        location, settings = shared_cache()
+        settings.enable()
+        self.addCleanup(shutil.rmtree, location, True)
+        self.addCleanup(settings.disable)
+        super().setUp()
+
+    def test_shared_entry_has_no_user_data(self):
+        self.authenticate()
+        self.assertEqual(
+            cache.get(shared_key(self.token.key)), (self.user.pk, True, None))
+
+    def test_other_process_loads_only_user(self):
+        self.authenticate()
+        # Процесс без записи в LRU: токен подтверждает общий кэш.
+        token_cache.entries.clear()
+        with self.assertNumQueries(1) as queries:
+            self.assertEqual(self.authenticate().pk, self.user.pk)
+        self.assertNotIn('authtoken', queries.captured_queries[0]['sql'])
+
+    def test_other_process_rejects_inactive_without_database(self):
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        token_cache.entries.clear()
+        with self.assertNumQueries(0), self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_revocation_from_other_process(self):
+        self.authenticate()
+        # Кэш токенов другого процесса: общий у них только кэш Django.
+        TokenCache(10, 30).forget(self.token.key)
+        with self.assertNumQueries(1):
+            self.authenticate()
@@ -0,0 +1,102 @@
+"""Версии кэша (api.cache) и условные запросы списка покупок."""
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from api.cache import bump_version, get_version, is_shared, last_modified
+from recipes.models import ShoppingList
+from recipes.seeding import synthetic_users
+from tests.utils import seed_catalogue
+
+NOW = 1700000000.5
+CART_URL = '/api/recipes/download_shopping_cart/?format=txt'
+
+
+class VersionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bumps_in_one_second_differ(self):
+        with mock.patch('time.time', return_value=NOW):
+            versions = [get_version('test')]
+            for _ in range(3):
+                bump_version('test')
+                versions.append(get_version('test'))
+        self.assertEqual(len(set(versions)), 4)
+        self.assertEqual(versions, sorted(versions))
+
+    def test_version_survives_clear(self):
+        old = get_version('test')
+        bump_version('test')
+        cache.clear()
+        self.assertGreater(get_version('test'), old + 1)
+
+    def test_no_last_modified_within_second(self):
+        with mock.patch('time.time', return_value=NOW):
+            bump_version('test')
+            self.assertIsNone(last_modified('test'))
+        with mock.patch('time.time', return_value=NOW + 1):
+            self.assertEqual(last_modified('test'), int(NOW))
+
+    def test_locmem_is_not_shared(self):
+        self.assertFalse(is_shared())
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.mkdtemp(prefix='foodgram-test-cache-'),
+        }}):
+            self.assertTrue(is_shared())
+
+
+class ShoppingCartConditionalTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue()
+        cls.user = synthetic_users().filter(
+            shopping_list_user__isnull=False).distinct().first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_etag_and_last_modified(self):
+        with mock.patch('time.time', return_value=NOW):
+            bump_version(f'shopping_cart:{self.user.pk}')
+        response = self.client.get(CART_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], http_date(int(NOW)))
+        etag = response['ETag']
+        response = self.client.get(CART_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            CART_URL, HTTP_IF_MODIFIED_SINCE=http_date(int(NOW)))
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_in_same_second_is_not_304(self):
+        carts = ShoppingList.objects.filter(user=self.user)
+        with mock.patch('time.time', return_value=NOW):
+            carts.first().delete()
+            response = self.client.get(CART_URL)
+            self.assertNotIn('Last-Modified', response)
+            etag = response['ETag']
+            carts.first().delete()
+            response = self.client.get(CART_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_varies_on_accept(self):
+        url = '/api/recipes/download_shopping_cart/'
+        for accept in ('text/csv', 'application/json'):
+            with self.subTest(accept=accept):
+                response = self.client.get(url, HTTP_ACCEPT=accept)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Accept', response['Vary'])
+                response = self.client.get(
+                    url, HTTP_ACCEPT=accept,
+                    HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertIn('Accept', response['Vary'])
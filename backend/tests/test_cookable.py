@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase, TestCase
+
+from api.cookable import CookableIndex
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import CustomUser
+
+BIG = 2 ** 40
+
+
+class CookableIndexTest(SimpleTestCase):
+    def test_bigint_ids(self):
+        index = CookableIndex()
+        index.build([(BIG + 1, BIG + 10), (BIG + 1, 2), (BIG + 2, 2)])
+        self.assertEqual(
+            index.rank([BIG + 10, 2], 5),
+            [(BIG + 2, 1.0, 0), (BIG + 1, 1.0, 0)],
+        )
+        self.assertEqual(index.rank([2], 5)[1], (BIG + 1, 0.5, 1))
+
+
+class CookableUpdateTest(TestCase):
+    def test_update_keeps_old_snapshot(self):
+        author = CustomUser.objects.create_user(
+            email='cook@example.com', username='cook', password='pw')
+        salt, flour, milk = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('соль', 'мука', 'молоко')
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='Блины', text='Пожарить.', cooking_time=20)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=salt, amount=1)
+        index = CookableIndex()
+        index.load()
+        postings = index.postings
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=flour, amount=200)
+        RecipeIngredient.objects.filter(ingredient=salt).delete()
+        index.update_recipes({recipe.pk})
+        self.assertEqual(index.rank([flour.pk], 5), [(recipe.pk, 1.0, 0)])
+        self.assertEqual(index.rank([salt.pk], 5), [])
+        self.assertEqual(list(postings[salt.pk]), [recipe.pk])
+        self.assertNotIn(flour.pk, postings)
+        self.assertNotIn(milk.pk, index.postings)
@@ -0,0 +1,49 @@
+from django.test import TestCase
+
+from recipes.models import Favorites, Recipe, ShoppingList
+from users.models import CustomUser, Follow
+
+
+class StaleInstanceCountersTest(TestCase):
+    """save() устаревшего объекта не перезаписывает счётчики."""
+
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(
+            email='author@example.com', username='author', password='pw')
+        self.reader = CustomUser.objects.create_user(
+            email='reader@example.com', username='reader', password='pw')
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Суп', text='Сварить.',
+            cooking_time=10,
+        )
+
+    def test_recipe(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        Favorites.objects.create(user=self.reader, recipe=self.recipe)
+        ShoppingList.objects.create(user=self.reader, recipe=self.recipe)
+        stale.name = 'Борщ'
+        stale.save()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Борщ')
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.recipe.in_carts_count, 1)
+
+    def test_user(self):
+        stale = CustomUser.objects.get(pk=self.author.pk)
+        Recipe.objects.create(
+            author=self.author, name='Каша', text='Сварить.',
+            cooking_time=5,
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        stale.set_password('new-password')
+        stale.save()
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.check_password('new-password'))
+        self.assertEqual(self.author.recipes_count, 2)
+        self.assertEqual(self.author.followers_count, 1)
+
+    def test_explicit_update_fields(self):
+        self.recipe.favorites_count = 7
+        self.recipe.save(update_fields=['favorites_count'])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 7)
@@ -0,0 +1,80 @@
+import base64
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tags
+from users.models import CustomUser, Follow
+
+
+def png():
+    buffer = BytesIO()
+    Image.new('RGB', (600, 400), 'orange').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+class RenditionsTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='cook@example.com', username='cook', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            'name': 'Блины',
+            'text': 'Пожарить.',
+            'cooking_time': 20,
+            'image': png(),
+            'tags': [Tags.objects.create(
+                name='Завтрак', slug='breakfast', color='#E26C2D').pk],
+            'ingredients': [{
+                'id': Ingredient.objects.create(
+                    name='мука', measurement_unit='г').pk,
+                'amount': 200,
+            }],
+        }
+
+    def create(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/recipes/', self.payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Recipe.objects.get(pk=response.data['recipe_id'])
+
+    def images(self, recipe):
+        with mock.patch.object(
+                default_storage, 'exists',
+                side_effect=AssertionError('exists() при сериализации')):
+            response = self.client.get(f'/api/recipes/{recipe.pk}/')
+        return response.data['images']
+
+    def test_original_until_ready(self):
+        recipe = self.create()
+        self.assertFalse(recipe.renditions_ready)
+        images = self.images(recipe)
+        self.assertEqual(set(images.values()), {
+            f'http://testserver{recipe.image.url}'})
+
+    @override_settings(JOBS_EAGER=True)
+    def test_ready_after_job(self):
+        recipe = self.create()
+        self.assertTrue(recipe.renditions_ready)
+        images = self.images(recipe)
+        self.assertIn('renditions/', images['thumb'])
+        self.assertNotEqual(images['thumb'], images['full'])
+
+    def test_subscription_urls_are_absolute(self):
+        recipe = self.create()
+        reader = CustomUser.objects.create_user(
+            email='reader@example.com', username='reader', password='pw')
+        Follow.objects.create(user=reader, author=self.user)
+        self.client.force_authenticate(reader)
+        response = self.client.get('/api/users/subscriptions/')
+        data, = response.data['results'][0]['recipes']
+        url = f'http://testserver{recipe.image.url}'
+        self.assertEqual(data['image'], url)
+        self.assertEqual(set(data['images'].values()), {url})
@@ -0,0 +1,166 @@
+"""Очередь jobs: захват задач, повторы, тайм-аут и восстановление."""
+import multiprocessing
+import sys
+import time
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import claim, enqueue, fail, recover, task
+from jobs.worker import Worker
+
+
+@task('test_noop', timeout=10, max_attempts=3)
+def noop(job):
+    return None
+
+
+def running(worker, **fields):
+    """Задача, которую уже взял worker."""
+    Job.objects.create(kind='test_noop')
+    job, = claim(worker, 1)
+    Job.objects.filter(pk=job.pk).update(**fields)
+    return Job.objects.get(pk=job.pk)
+
+
+def spawn(target, *args):
+    process = multiprocessing.Process(target=target, args=args)
+    process.start()
+    return process
+
+
+@override_settings(JOBS_RETRY_DELAY=10)
+class QueueTest(TestCase):
+    def test_claim_takes_each_job_once(self):
+        for number in range(3):
+            Job.objects.create(kind='test_noop', params={'n': number})
+        first = claim('first', 2)
+        second = claim('second', 2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(
+            {job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(claim('third', 2), [])
+        self.assertEqual(
+            Job.objects.filter(worker='first', attempts=1).count(), 2)
+
+    def test_claim_skips_delayed_jobs(self):
+        Job.objects.create(
+            kind='test_noop', run_after=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(claim('worker', 1), [])
+
+    def test_enqueue_deduplicates_unfinished(self):
+        job = enqueue('test_noop', n=1)
+        self.assertEqual(enqueue('test_noop', n=1), job)
+        claim('worker', 1)
+        self.assertEqual(enqueue('test_noop', n=1), job)
+        self.assertNotEqual(enqueue('test_noop', n=2), job)
+
+    def test_enqueue_recovers_abandoned_duplicate(self):
+        job = enqueue('test_noop')
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=1, worker='gone:1',
+            started=timezone.now() - timedelta(seconds=21))
+        self.assertEqual(enqueue('test_noop'), job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.error, 'Воркер не завершил задачу.')
+
+    def test_enqueue_replaces_abandoned_last_attempt(self):
+        job = enqueue('test_noop')
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=3, worker='gone:1',
+            started=timezone.now() - timedelta(seconds=21))
+        new = enqueue('test_noop')
+        self.assertNotEqual(new, job)
+        self.assertEqual(new.status, Job.QUEUED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_fail_retries_with_backoff(self):
+        job = running('worker')
+        delays = []
+        for attempt in range(1, 3):
+            before = timezone.now()
+            job = fail(job.pk, 'ошибка')
+            self.assertEqual(job.status, Job.QUEUED)
+            delays.append(round((job.run_after - before).total_seconds()))
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            job, = claim('worker', 1)
+        self.assertEqual(delays, [10, 20])
+        job = fail(job.pk, 'ошибка')
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertIsNotNone(job.finished)
+
+    def test_recover_requeues_stale_jobs(self):
+        stale = running(
+            'other:1', started=timezone.now() - timedelta(seconds=21))
+        fresh = running('other:2')
+        self.assertEqual(recover(), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, Job.QUEUED)
+        self.assertEqual(stale.error, 'Воркер не завершил задачу.')
+        self.assertEqual(fresh.status, Job.RUNNING)
+
+    def test_recover_requeues_jobs_of_restarted_worker(self):
+        orphan = running('host:1')
+        own = running('host:1')
+        self.assertEqual(recover('host:1', [own.pk]), 1)
+        orphan.refresh_from_db()
+        own.refresh_from_db()
+        self.assertEqual(orphan.status, Job.QUEUED)
+        self.assertEqual(own.status, Job.RUNNING)
+
+
+@override_settings(JOBS_RETRY_DELAY=10)
+class WorkerTest(TestCase):
+    def setUp(self):
+        self.worker = Worker(log=lambda message: None)
+        self.addCleanup(self.worker.stop)
+
+    def test_reap_kills_job_after_timeout(self):
+        job = running(self.worker.name)
+        process = spawn(time.sleep, 60)
+        self.worker.running[job.pk] = (process, time.monotonic() - 1)
+        self.worker.reap()
+        self.assertFalse(process.is_alive())
+        self.assertEqual(self.worker.running, {})
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.error, 'Превышено время выполнения.')
+
+    def test_reap_leaves_job_within_timeout(self):
+        job = running(self.worker.name)
+        process = spawn(time.sleep, 60)
+        self.worker.running[job.pk] = (process, time.monotonic() + 60)
+        self.worker.reap()
+        self.assertTrue(process.is_alive())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+
+    def test_reap_requeues_crashed_job(self):
+        job = running(self.worker.name)
+        process = spawn(sys.exit, 3)
+        process.join()
+        self.worker.running[job.pk] = (process, time.monotonic() + 60)
+        self.worker.reap()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.error, 'Код завершения 3.')
+
+    def test_recover_runs_periodically(self):
+        self.worker.recover()
+        orphan = running('other:1')
+        Job.objects.filter(pk=orphan.pk).update(
+            started=timezone.now() - timedelta(minutes=1))
+        self.worker.recover()
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, Job.RUNNING)
+        self.worker.recovered_at -= 60
+        self.worker.recover()
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, Job.QUEUED)
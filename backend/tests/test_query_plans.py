@@ -0,0 +1,58 @@
+import re
+from itertools import combinations
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe, Tags
+from recipes.seeding import synthetic_users
+from tests.utils import seed_catalogue
+
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def explain(queryset):
+    """План запроса с запретом последовательного чтения.
+
+    На маленькой базе PostgreSQL выбирает Seq Scan, даже когда индекс
+    есть; с enable_seqscan = off он остаётся в плане, только если
+    подходящего индекса нет.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'планы PostgreSQL')
+class RecipeFilterPlansTest(TestCase):
+    """Ни одна комбинация фильтров RecipeFilter не читает таблицу целиком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue()
+        cls.user = synthetic_users().order_by('pk').first()
+        cls.params = {
+            'tags': list(Tags.objects.order_by('pk').values_list(
+                'slug', flat=True)[:2]),
+            'author': [str(Recipe.objects.order_by('pk').values_list(
+                'author', flat=True).first())],
+            'is_favorited': ['1'],
+            'is_in_shopping_cart': ['1'],
+        }
+
+    def test_no_seq_scan(self):
+        factory = RequestFactory()
+        for size in range(len(self.params) + 1):
+            for names in combinations(self.params, size):
+                with self.subTest(filters=names):
+                    request = factory.get('/api/recipes/', {
+                        name: self.params[name] for name in names})
+                    request.user = self.user
+                    plan = explain(RecipeFilter(
+                        request.GET, queryset=Recipe.objects.all(),
+                        request=request,
+                    ).qs)
+                    self.assertFalse(SEQ_SCAN.findall(plan), plan)
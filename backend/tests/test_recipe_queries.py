@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.seeding import synthetic_users
+from tests.utils import seed_catalogue
+
+
+class RecipeListQueriesTest(TestCase):
+    """Число запросов страницы каталога не зависит от её размера."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue()
+        cls.user = synthetic_users().order_by('pk').first()
+
+    def setUp(self):
+        cache.clear()
+        self.guest = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_anonymous_page(self):
+        # COUNT, рецепты с авторами, теги, ингредиенты.
+        for limit in (3, 12):
+            with self.assertNumQueries(4):
+                response = self.guest.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_anonymous_page_from_cache(self):
+        self.guest.get('/api/recipes/')
+        with self.assertNumQueries(0):
+            response = self.guest.get('/api/recipes/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    @override_settings(ALLOWED_HOSTS=['one.example', 'two.example'])
+    def test_cached_page_links_use_request_host(self):
+        url = '/api/recipes/?limit=2'
+        self.guest.get(url, HTTP_HOST='one.example')
+        response = self.guest.get(url, HTTP_HOST='two.example', secure=True)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(
+            response.data['next'].startswith('https://two.example/'))
+
+    def test_authenticated_page(self):
+        # Плюс id подписок, избранного и корзины пользователя.
+        for limit in (3, 12):
+            with self.assertNumQueries(7):
+                response = self.client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+
+
+class SubscriptionQueriesTest(TestCase):
+    """Подписки: число запросов не зависит от limit и recipes_limit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(follows=5)
+        cls.user = synthetic_users().order_by('pk').first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_page(self):
+        # COUNT, авторы страницы, их последние рецепты одним запросом.
+        for limit, recipes_limit in ((1, 1), (2, 3), (5, 0)):
+            with self.assertNumQueries(3):
+                response = self.client.get(
+                    '/api/users/subscriptions/',
+                    {'limit': limit, 'recipes_limit': recipes_limit},
+                )
+            self.assertEqual(len(response.data['results']), limit)
+            if recipes_limit:
+                for author in response.data['results']:
+                    self.assertLessEqual(
+                        len(author['recipes']), recipes_limit)
@@ -0,0 +1,101 @@
+"""Чтение из реплики (api.replicas) на двух базах SQLite.
+
+default заполнен каталогом, реплика пуста: по ответу и по запросам
+к соединению видно, из какой базы читал запрос.
+"""
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, ShoppingList
+from recipes.seeding import synthetic_users
+from users.models import Follow
+from tests.utils import seed_catalogue
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaReadTest(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue()
+        cls.user, cls.other = synthetic_users().order_by('pk')[:2]
+        cls.recipes = Recipe.objects.count()
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def recipes_seen(self, client):
+        """Сколько рецептов видит клиент и были ли запросы к реплике."""
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['count'], bool(queries.captured_queries)
+
+    def test_safe_request_reads_replica(self):
+        self.assertEqual(
+            self.recipes_seen(self.client_for(self.user)), (0, True))
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas_reads_default(self):
+        self.assertEqual(
+            self.recipes_seen(self.client_for(self.user)),
+            (self.recipes, False),
+        )
+
+    def test_favorite_sticks_user_to_default(self):
+        client = self.client_for(self.user)
+        recipe = Recipe.objects.exclude(
+            favorites_recipe__user=self.user).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/api/recipes/{recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.recipes_seen(client), (self.recipes, False))
+        # Другие пользователи по-прежнему читают из реплики.
+        self.assertEqual(
+            self.recipes_seen(self.client_for(self.other)), (0, True))
+
+    def test_follow_sticks_user_to_default(self):
+        client = self.client_for(self.user)
+        author = synthetic_users().exclude(pk=self.user.pk).exclude(
+            pk__in=Follow.objects.filter(user=self.user).values('author')
+        ).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/api/users/{author.pk}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.recipes_seen(client), (self.recipes, False))
+
+    def test_write_goes_to_default(self):
+        client = self.client_for(self.user)
+        recipe = Recipe.objects.exclude(
+            favorites_recipe__user=self.user).first()
+        with CaptureQueriesContext(connections['replica']) as queries:
+            client.post(f'/api/recipes/{recipe.pk}/favorite/')
+        self.assertEqual(queries.captured_queries, [])
+
+    def test_shopping_cart_download_reads_default(self):
+        # Реплика отстаёт: корзины в ней нет.
+        recipe = Recipe.objects.filter(ingredient_used__isnull=False).first()
+        ShoppingList.objects.create(user=self.user, recipe=recipe)
+        name = recipe.ingredient_used.first().ingredient.name
+        client = self.client_for(self.user)
+        for export_format in ('pdf', 'txt', 'txt'):
+            with self.subTest(export_format=export_format):
+                with CaptureQueriesContext(connections['replica']) as queries:
+                    response = client.get(
+                        '/api/recipes/download_shopping_cart/'
+                        f'?format={export_format}')
+                    content = (b''.join(response) if response.streaming
+                               else response.content)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(queries.captured_queries, [])
+                if export_format == 'txt':
+                    self.assertIn(name, content.decode())
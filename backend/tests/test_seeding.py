@@ -0,0 +1,53 @@
+"""Удаление синтетических данных (seed_data --flush)."""
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import get_version, shopping_cart_name
+from recipes.models import Favorites, Recipe, ShoppingList
+from recipes.seeding import flush, synthetic_users
+from users.models import CustomUser, Follow
+from tests.utils import CATALOGUE, seed_catalogue
+
+
+class FlushTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email='cook@example.com', username='cook', password='pw')
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Суп', text='Сварить.', cooking_time=10)
+
+    def flush_queries(self, users):
+        seed_catalogue(users=users)
+        with CaptureQueriesContext(connection) as queries:
+            flush()
+        self.assertFalse(synthetic_users().exists())
+        return len(queries)
+
+    def test_queries_do_not_grow_with_data(self):
+        self.assertEqual(self.flush_queries(3), self.flush_queries(12))
+
+    def test_command_reconciles_real_users(self):
+        seed_catalogue()
+        synthetic = synthetic_users().first()
+        Follow.objects.create(user=synthetic, author=self.user)
+        Favorites.objects.create(user=synthetic, recipe=self.recipe)
+        ShoppingList.objects.create(
+            user=self.user, recipe=synthetic.recipes.first())
+        version = get_version(shopping_cart_name(self.user.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('seed_data', flush=True, stdout=StringIO(),
+                         **CATALOGUE)
+        self.assertEqual(synthetic_users().count(), CATALOGUE['users'])
+        self.user.refresh_from_db()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.user.followers_count, 0)
+        self.assertEqual(self.recipe.favorites_count, 0)
+        self.assertFalse(self.user.shopping_list_user.exists())
+        self.assertNotEqual(
+            get_version(shopping_cart_name(self.user.pk)), version)
@@ -0,0 +1,15 @@
+from recipes.seeding import Seeder
+
+CATALOGUE = {
+    'users': 6,
+    'recipes_per_author': 5,
+    'ingredients_per_recipe': 3,
+    'follows': 3,
+    'favorites': 4,
+    'cart': 2,
+}
+
+
+def seed_catalogue(seed=0, **params):
+    """Небольшой синтетический каталог (см. recipes.seeding)."""
+    Seeder(seed=seed).run(**{**CATALOGUE, **params})
@@ -1,53 +1,179 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
+from jobs.models import Job
 from recipes.models import Recipe, Ingredient, Tags, RecipeIngredient
 from recipes.models import Favorites, ShoppingList
 from users.models import CustomUser, Follow
 
+# С какого размера таблицы вместо COUNT(*) берётся оценка PostgreSQL.
+ESTIMATE_THRESHOLD = 100_000
 
-class AdminUser(admin.ModelAdmin):
-    list_display = ('username', 'email', 'first_name', 'last_name')
-    list_filter = ('username', 'email')
 
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает строки большой таблицы целиком.
 
-class AdminIngredient(admin.ModelAdmin):
+    Для списка без фильтров в PostgreSQL число строк берётся
+    из статистики планировщика (pg_class.reltuples).
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > ESTIMATE_THRESHOLD:
+                return int(row[0])
+        return queryset.count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного подсчёта строк."""
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+
+class UserInputFilter(admin.SimpleListFilter):
+    """Фильтр по пользователю через поле ввода, а не список всех.
+
+    Значение с @ ищется как email, остальное — как начало username.
+    """
+    template = 'admin/input_filter.html'
+    field = None
+
+    def lookups(self, request, model_admin):
+        return ((None, None),)
+
+    def choices(self, changelist):
+        yield {
+            'value': self.value(),
+            'placeholder': 'email или username',
+            'query_parts': [
+                (name, value)
+                for name, value in changelist.get_filters_params().items()
+                if name != self.parameter_name
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if not value:
+            return queryset
+        if '@' in value:
+            return queryset.filter(**{f'{self.field}__email__iexact': value})
+        return queryset.filter(
+            **{f'{self.field}__username__istartswith': value})
+
+
+class AuthorFilter(UserInputFilter):
+    title = 'автор'
+    parameter_name = 'author_name'
+    field = 'author'
+
+
+class UserFilter(UserInputFilter):
+    title = 'пользователь'
+    parameter_name = 'user_name'
+    field = 'user'
+
+
+class FollowerFilter(UserFilter):
+    title = 'подписчик'
+
+
+class AdminUser(LargeTableAdmin):
+    list_display = (
+        'username', 'email', 'first_name', 'last_name',
+        'recipes_count', 'followers_count',
+    )
+    list_filter = ('is_staff', 'is_active')
+    search_fields = ('email', 'username')
+
+
+class AdminIngredient(LargeTableAdmin):
     """Поиск по названию."""
     list_display = ('name', 'measurement_unit')
     search_fields = ('name',)
 
 
-class AdminRecipe(admin.ModelAdmin):
-    """Фильтрация по полям."""
+class AdminTags(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'color')
+    search_fields = ('name', 'slug')
+
+
+class AdminRecipe(LargeTableAdmin):
+    """Фильтрация по тегам и автору, поиск по названию."""
     list_display = (
-        'id', 'name', 'author', 'get_favorites', 'get_tags'
+        'id', 'name', 'author', 'get_favorites', 'in_carts_count',
+        'get_tags'
     )
-    list_filter = ('author', 'name', 'tags')
+    list_select_related = ('author',)
+    list_filter = ('tags', AuthorFilter)
     search_fields = ('name',)
+    autocomplete_fields = ('author', 'tags')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('tags')
 
     def get_favorites(self, obj):
-        return obj.favorites_recipe.count()
+        return obj.favorites_count
 
     get_favorites.short_description = (
         'В избранном'
     )
+    get_favorites.admin_order_field = 'favorites_count'
 
     def get_tags(self, obj):
-        return '\n'.join(obj.tags.values_list('name', flat=True))
+        return '\n'.join(tag.name for tag in obj.tags.all())
 
     get_tags.short_description = 'Теги'
 
 
-class AdminFollow(admin.ModelAdmin):
+class AdminRecipeIngredient(LargeTableAdmin):
+    list_display = ('recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+
+
+class AdminUserRecipe(LargeTableAdmin):
+    """Избранное и список покупок: пары пользователь — рецепт."""
+    list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    list_filter = (UserFilter,)
+    search_fields = ('recipe__name',)
+    autocomplete_fields = ('user', 'recipe')
+
+
+class AdminFollow(LargeTableAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('user', 'author')
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('author__email', 'author__username')
+    list_filter = (FollowerFilter, AuthorFilter)
+    autocomplete_fields = ('user', 'author')
+
+
+class AdminJob(LargeTableAdmin):
+    list_display = ('id', 'kind', 'user', 'status', 'attempts', 'created',
+                    'finished')
+    list_select_related = ('user',)
+    list_filter = ('status', 'kind', UserFilter)
+    readonly_fields = ('started', 'finished', 'worker', 'error')
+    autocomplete_fields = ('user',)
 
 
 admin.site.register(Recipe, AdminRecipe)
 admin.site.register(Ingredient, AdminIngredient)
 admin.site.register(CustomUser, AdminUser)
-admin.site.register(Favorites)
-admin.site.register(ShoppingList)
+admin.site.register(Favorites, AdminUserRecipe)
+admin.site.register(ShoppingList, AdminUserRecipe)
 admin.site.register(Follow, AdminFollow)
-admin.site.register(Tags)
-admin.site.register(RecipeIngredient)
+admin.site.register(Tags, AdminTags)
+admin.site.register(RecipeIngredient, AdminRecipeIngredient)
+admin.site.register(Job, AdminJob)
@@ -0,0 +1,53 @@
+import time
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Measure admin changelist render time and query count'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*',
+            help='app_label.model, по умолчанию все зарегистрированные',
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--query', default='',
+            help='строка запроса changelist, например "q=борщ&p=10"',
+        )
+
+    def handle(self, *args, **options):
+        registry = {
+            model._meta.label_lower: model_admin
+            for model, model_admin in admin.site._registry.items()
+        }
+        labels = options['models'] or sorted(registry)
+        unknown = set(labels) - set(registry)
+        if unknown:
+            raise CommandError(f'Не зарегистрированы: {", ".join(unknown)}')
+        # Несохранённый суперпользователь: права есть, запросов к БД нет.
+        user = CustomUser(is_active=True, is_staff=True, is_superuser=True)
+        factory = RequestFactory()
+        for label in labels:
+            model_admin = registry[label]
+            timings = []
+            for _ in range(options['repeat']):
+                request = factory.get(f'/admin/?{options["query"]}')
+                request.user = user
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = model_admin.changelist_view(request)
+                    response.render()
+                    timings.append(time.perf_counter() - started)
+            self.stdout.write(
+                f'{label}: {response.status_code}, '
+                f'best {min(timings) * 1000:.0f} ms, '
+                f'{len(queries.captured_queries)} queries'
+            )
@@ -0,0 +1,37 @@
+"""Таблица и названия пользователя из CustomUser.Meta.
+
+db_table = 'custom_user' и verbose_name были в модели с самого начала,
+но в 0001_initial не попали: на базе, созданной миграциями, таблица
+называется users_customuser, а запросы идут в custom_user. Миграция
+переименовывает таблицу (и таблицы групп и прав) только там, где
+custom_user ещё нет: базы, где её создали вручную, не меняются.
+"""
+from django.db import migrations
+
+
+class AlterModelTableIfMissing(migrations.AlterModelTable):
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        table = to_state.apps.get_model(app_label, self.name)._meta.db_table
+        if table in schema_editor.connection.introspection.table_names():
+            return
+        super().database_forwards(
+            app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='customuser',
+            options={'verbose_name': 'Пользователь', 'verbose_name_plural': 'Пользователи'},
+        ),
+        AlterModelTableIfMissing(
+            name='customuser',
+            table='custom_user',
+        ),
+    ]
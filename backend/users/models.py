@@ -4,17 +4,52 @@ from django.db.models import Q, F
 from django.core.exceptions import ValidationError
 
 
-class CustomUser(AbstractUser):
+class CountersMixin:
+    """Не даёт обычному save() перезаписать счётчики.
+
+    Счётчики (recipes.counters) меняются в БД через F(), значения в
+    загруженном объекте устаревают. Поэтому save() существующей
+    записи без update_fields сохраняет все поля, кроме counter_fields;
+    записать счётчик можно, только перечислив его в update_fields.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not args and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')
+                and not self._state.adding):
+            skipped = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in skipped
+                and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class CustomUser(CountersMixin, AbstractUser):
     """Модель пользователя."""
     username = models.CharField(blank=True, max_length=150, )
     email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=150, blank=True)
     last_name = models.CharField(max_length=150, blank=True)
     is_subscribed = models.BooleanField(default=False)
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Рецептов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков',
+    )
     (AbstractUser._meta.get_field('groups').
      remote_field.related_name) = 'custom_user_set'
     (AbstractUser._meta.get_field('user_permissions')
      .remote_field.related_name) = 'custom_user_set'
+    counter_fields = ('recipes_count', 'followers_count')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
 